@@ -0,0 +1,410 @@
+"""
+Micro-benchmarks for the hot paths of the bot.
+
+Each benchmark builds random Halite frames on the usual map sizes and prints timings per map size, e.g.
+
+    python3 bench.py gamemap
+    python3 bench.py gamemap --sizes 20 30 50 --repeat 50
+"""
+
+import argparse
+import random
+import tempfile
+import timeit
+
+import numpy as np
+
+import costfield
+import engine
+import forward
+import hlt
+import influence
+import MyBot
+import pathing
+import replay
+import workers
+
+MAP_SIZES = (20, 25, 30, 35, 40, 45, 50)
+SEARCH_DEPTHS = (3, 4, 5, 6, 7, 8)
+CANDIDATE_COUNTS = (1, 8, 32, 64)
+
+
+def random_frame_strings(width, height, players=2, seed=0, radius=None):
+    "Returns (size_string, production_string, map_string) for a random frame; radius=0 gives a starting frame."
+    rng = random.Random(seed)
+    production = [rng.randint(0, 15) for _ in range(width * height)]
+    owners = [0] * (width * height)
+    strengths = [rng.randint(0, 255) for _ in range(width * height)]
+    # grow a blob of territory around a random seed square for every player
+    if radius is None:
+        radius = max(2, min(width, height) // (2 * players))
+    for player in range(1, players + 1):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        for dy in range(-radius, radius + 1):
+            for dx in range(-radius, radius + 1):
+                if abs(dx) + abs(dy) <= radius and (not dx and not dy or rng.random() < 0.8):
+                    owners[((y0 + dy) % height) * width + (x0 + dx) % width] = player
+    # neutral squares next to fighting are often emptied out
+    for i in range(width * height):
+        if owners[i] == 0 and rng.random() < 0.05:
+            strengths[i] = 0
+
+    runs = []
+    count, current = 0, owners[0]
+    for owner in owners:
+        if owner == current:
+            count += 1
+        else:
+            runs.extend((count, current))
+            count, current = 1, owner
+    runs.extend((count, current))
+
+    size_string = '{} {}'.format(width, height)
+    production_string = ' '.join(map(str, production))
+    map_string = ' '.join(map(str, runs + strengths))
+    return size_string, production_string, map_string
+
+
+def report(name, size, seconds, repeat):
+    print('{:<28} {:>2}x{:<2} {:>10.3f} ms'.format(name, size, size, 1000 * seconds / repeat))
+
+
+def bench_gamemap(sizes, repeat):
+    "Per-frame cost of decoding a frame and then iterating over every square, plain vs array-backed GameMap."
+    for size in sizes:
+        size_string, production_string, map_string = random_frame_strings(size, size)
+        plain = hlt.GameMap(size_string, production_string, map_string)
+        arrays = hlt.ArrayGameMap(size_string, production_string, map_string)
+
+        def plain_frame():
+            plain.get_frame(map_string)
+            for _ in range(5):
+                sum(1 for square in plain if square.owner == 1)
+
+        def array_frame():
+            arrays.get_frame(map_string)
+            for _ in range(5):
+                sum(1 for square in arrays if square.owner == 1)
+
+        def array_frame_vectorized():
+            arrays.get_frame(map_string)
+            for _ in range(5):
+                int((arrays.owner == 1).sum())
+
+        for name, func in (('GameMap', plain_frame), ('ArrayGameMap', array_frame),
+                           ('ArrayGameMap (arrays only)', array_frame_vectorized)):
+            report(name, size, timeit.timeit(func, number=repeat), repeat)
+
+
+def legacy_decode(map_string, width, height):
+    "The original GameMap.get_frame parser, kept as the reference for the decode benchmark."
+    split_string = map_string.split()
+    owners = list()
+    while len(owners) < width * height:
+        counter = int(split_string.pop(0))
+        owner = int(split_string.pop(0))
+        owners.extend([owner] * counter)
+    return owners, [list(row) for row in hlt.grouper(map(int, split_string), width)]
+
+
+def bench_decode(sizes, repeat):
+    "Frame parsing only: the original pop(0) parser vs hlt.decode_frame on str and bytes input."
+    for size in sizes:
+        # many players and small blobs give long owner runs, the worst case for the pop(0) loop
+        map_string = random_frame_strings(size, size, players=6, radius=size // 6)[2]
+        map_bytes = map_string.encode()
+        for name, func in (('legacy parser', lambda: legacy_decode(map_string, size, size)),
+                           ('decode_frame (str)', lambda: hlt.decode_frame(map_string, size * size)),
+                           ('decode_frame (bytes)', lambda: hlt.decode_frame(map_bytes, size * size))):
+            report(name, size, timeit.timeit(func, number=repeat), repeat)
+
+
+def legacy_grassfire(game_map, my_id):
+    "The original dict / list.pop(0) grassfire from MyBot.py, kept as the reference for the grassfire benchmark."
+    node_queue = []
+    dist_dict = {}
+    for square in game_map:
+        if square.owner == 0 and square.strength > 0:
+            dist = 255
+        elif (square.owner == 0 and square.strength == 0) or square.owner == my_id:
+            dist = 0
+        else:
+            dist = 1
+        dist_dict[(square.x, square.y)] = dist
+        if any([n for n in game_map.neighbors(square) if n.owner not in (0, my_id)]) and dist != 255:
+            node_queue.append((square.x, square.y))
+
+    while node_queue:
+        x, y = node_queue.pop(0)
+        if dist_dict[(x, y)] == 0:
+            neighbors = list(game_map.neighbors_xy(x, y))
+            value_neighbors = [dist_dict[n] for n in neighbors if dist_dict[n] not in (0, 255)]
+            if len(value_neighbors) > 0:
+                dist_dict[(x, y)] = 1 + min(value_neighbors)
+            for n in neighbors:
+                if dist_dict[n] == 0:
+                    node_queue.append(n)
+    return dist_dict
+
+
+def bench_grassfire(sizes, repeat):
+    "Grassfire distance field: the original dict BFS vs pathing.grassfire."
+    for size in sizes:
+        game_map = hlt.ArrayGameMap(*random_frame_strings(size, size, players=4))
+        owner, strength = game_map.owner.ravel(), game_map.strength.ravel()
+        neighbors = game_map.neighbor_table[:, :4]
+        for name, func in (('legacy grassfire', lambda: legacy_grassfire(game_map, 1)),
+                           ('pathing.grassfire', lambda: pathing.grassfire(owner, strength, 1, neighbors))):
+            report(name, size, timeit.timeit(func, number=repeat), repeat)
+
+
+def legacy_influence(game_map, my_id):
+    "The original set-based get_enemy_influence_map from MyBot.py, kept as the reference for the influence benchmark."
+    enemy_set_map = {(square.x, square.y): set() for square in game_map}
+    for square in game_map:
+        if not (square.owner == 0 and square.strength > 0):
+            box = list(game_map.neighbors(square, include_self=True))
+            if any(n.owner == 0 and n.strength == 0 for n in box):
+                enemies = [n for n in box if n.owner not in (my_id, 0)]
+                if enemies:
+                    for tile in [n for n in box if not (n.owner == 0 and n.strength > 0)]:
+                        enemy_set_map[(tile.x, tile.y)].update(enemies)
+    return {xy: sum(x.strength for x in enemies) for xy, enemies in enemy_set_map.items()}, enemy_set_map
+
+
+def bench_influence(sizes, repeat):
+    "Enemy influence map: the original per-tile sets vs influence.InfluenceMap."
+    for size in sizes:
+        game_map = hlt.ArrayGameMap(*random_frame_strings(size, size, players=4))
+        for name, func in (('legacy influence', lambda: legacy_influence(game_map, 1)),
+                           ('influence.InfluenceMap', lambda: influence.InfluenceMap(game_map, 1))):
+            report(name, size, timeit.timeit(func, number=repeat), repeat)
+
+
+def bench_neighbors(sizes, repeat):
+    "neighbors() calls per second: plain GameMap vs the table-backed ArrayGameMap and its flat-index accessor."
+    for size in sizes:
+        strings = random_frame_strings(size, size)
+        plain, arrays = hlt.GameMap(*strings), hlt.ArrayGameMap(*strings)
+        squares = list(arrays)
+        indices = list(range(size * size))
+        for name, func in (('GameMap.neighbors', lambda: [list(plain.neighbors(s, include_self=True)) for s in squares]),
+                           ('ArrayGameMap.neighbors',
+                            lambda: [list(arrays.neighbors(s, include_self=True)) for s in squares]),
+                           ('ArrayGameMap.neighbor_indices',
+                            lambda: [arrays.neighbor_indices(i, include_self=True) for i in indices])):
+            seconds = timeit.timeit(func, number=repeat)
+            print('{:<30} {:>2}x{:<2} {:>12,.0f} calls/s'.format(name, size, size, repeat * len(squares) / seconds))
+
+
+def legacy_nearest_direction(game_map, owned_square, targets, max_dist):
+    "The original brute-force find_nearest_direction from MyBot.py, kept as the reference for the routing benchmark."
+    min_distance = max_dist
+    min_x, min_y = min_distance, min_distance
+    square_x, square_y = 0, 0
+    for square in targets:
+        dx, dy, dist = game_map.get_distance_2(square, owned_square)
+        if dist < min_distance:
+            min_x, min_y, square_x, square_y, min_distance = dx, dy, square.x, square.y, dist
+    if min_x > min_y:
+        return hlt.EAST if square_x - owned_square.x == min_x or square_x + game_map.width - owned_square.x == min_x \
+            else hlt.WEST
+    return hlt.SOUTH if square_y - owned_square.y == min_y or square_y + game_map.height - owned_square.y == min_y \
+        else hlt.NORTH
+
+
+def bench_routing(sizes, repeat):
+    "Routing every square to its nearest target: brute force over all pairs vs pathing.nearest_target_directions."
+    for size in sizes:
+        game_map = hlt.ArrayGameMap(*random_frame_strings(size, size, players=4))
+        owned = [square for square in game_map if square.owner == 1]
+        targets = [square for square in game_map if square.owner == 0][::4]
+        target_indices = [game_map.index(square) for square in targets]
+        neighbors = game_map.neighbor_table[:, :4]
+        for name, func in (('legacy nearest direction',
+                            lambda: [legacy_nearest_direction(game_map, s, targets, size) for s in owned]),
+                           ('pathing.nearest_target_dirs',
+                            lambda: pathing.nearest_target_directions(target_indices, size, size, neighbors, size))):
+            report(name, size, timeit.timeit(func, number=repeat), repeat)
+
+
+def bench_search(sizes, repeat):
+    "Production search (get_initial_moves) and the whole turn of MyBot for every search depth."
+    for size in sizes:
+        game_map = hlt.ArrayGameMap(*random_frame_strings(size, size, players=2))
+        bot = MyBot.Bot(1, game_map)
+        bot.scheduler.budget = float('inf')
+        bot.scheduler.start_turn()
+        # the targets read the costs and stats of the frame, as in play_turn
+        bot.costs.update()
+        bot.stats.update()
+        targets = bot.get_prod_targets()[0]
+        for depth in SEARCH_DEPTHS:
+            bot.search_depth = depth
+
+            def search():
+                bot.board.reset()
+                bot.get_initial_moves(list(targets))
+
+            report('search depth {}'.format(depth), size, timeit.timeit(search, number=repeat), repeat)
+            report('turn, search depth {}'.format(depth), size, timeit.timeit(bot.play_turn, number=repeat), repeat)
+
+
+def bench_distance(sizes, repeat):
+    """
+    Torus distances for 100 squares against every square: per-pair formula vs tables, one-vs-many and many-vs-many.
+    All of them are checked against the formula first.
+    """
+    for size in sizes:
+        game_map = hlt.ArrayGameMap(*random_frame_strings(size, size))
+        squares = game_map.squares
+        sources = list(range(0, size * size, size * size // 100))[:100]
+        targets = np.arange(size * size)
+        source_squares = [squares[i] for i in sources]
+        # the tables have to give what the formula gives before their speed means anything
+        formula = np.array([[hlt.GameMap.get_distance(game_map, a, b) for b in squares] for a in source_squares])
+        assert np.array_equal(game_map.distance_matrix(sources, targets), formula)
+        assert np.array_equal([game_map.distances(i, targets) for i in sources], formula)
+        assert np.array_equal([[game_map.get_distance(a, b) for b in squares] for a in source_squares], formula)
+        for name, func in (('get_distance, formula',
+                            lambda: [hlt.GameMap.get_distance(game_map, a, b) for a in source_squares for b in squares]),
+                           ('get_distance, tables',
+                            lambda: [game_map.get_distance(a, b) for a in source_squares for b in squares]),
+                           ('distances, one vs many', lambda: [game_map.distances(i, targets) for i in sources]),
+                           ('distance_matrix', lambda: game_map.distance_matrix(sources, targets))):
+            report(name, size, timeit.timeit(func, number=repeat), repeat)
+
+
+def bench_forward(sizes, repeat):
+    "Scoring K random candidate move sets with the one-step forward model, per call and per candidate."
+    for size in sizes:
+        game_map = hlt.ArrayGameMap(*random_frame_strings(size, size, players=4))
+        model = forward.ForwardModel(game_map, 1)
+        rng = np.random.default_rng(0)
+        for k in CANDIDATE_COUNTS:
+            candidates = rng.integers(0, 5, (k, size * size))
+            seconds = timeit.timeit(lambda: model.score(candidates), number=repeat)
+            report('forward score, {} candidates'.format(k), size, seconds, repeat)
+
+
+def selfplay_frames(size, seed):
+    "(production, frames) of an in-process MyBot vs MyBot game, frames as flat (owner, strength) pairs."
+    bots = [engine.InProcessBot(MyBot.Bot.from_arrays, 'MyBot') for _ in range(2)]
+    with tempfile.TemporaryDirectory() as replay_dir:
+        result = engine.run_game(size, size, bots, seed=seed, timeouts=False, replay_dir=replay_dir, quiet=True)
+        reader = replay.ReplayReader(result['replay'])
+        frames = [(owner.ravel(), strength.ravel()) for owner, strength in reader.frames()]
+        reader.close()
+    return reader.production, frames
+
+
+def bench_incremental(sizes, repeat):
+    "Grassfire and influence over the second half of a self-play game: rebuilt every frame vs repaired."
+    for size in sizes:
+        production, frames = selfplay_frames(size, seed=size)
+        frames = frames[len(frames) // 2:]
+        game_map = hlt.ArrayGameMap.from_arrays(production, *frames[0])
+        neighbors = game_map.neighbor_table[:, :4]
+
+        def rebuilt():
+            for owner, strength in frames:
+                game_map.set_frame(owner, strength)
+                pathing.grassfire(owner, strength, 1, neighbors)
+                influence.InfluenceMap(game_map, 1)
+
+        def repaired():
+            field, influence_map = pathing.GrassfireField(game_map, 1, neighbors), influence.InfluenceMap(game_map, 1)
+            for owner, strength in frames:
+                game_map.set_frame(owner, strength)
+                field.update()
+                influence_map.update()
+
+        for name, func in (('rebuilt every frame', rebuilt), ('repaired from frame diffs', repaired)):
+            report(name, size, timeit.timeit(func, number=repeat), repeat * len(frames))
+
+
+def bench_workers(sizes, repeat):
+    "Self-play frames: costs, grassfire and influence in this process vs the two fields handed to worker processes."
+    for size in sizes:
+        production, frames = selfplay_frames(size, seed=size)
+        game_map = hlt.ArrayGameMap.from_arrays(production, *frames[0])
+        costs = costfield.CostField(game_map)
+        field, influence_map = pathing.GrassfireField(game_map, 1, game_map.neighbor_table[:, :4]), \
+            influence.InfluenceMap(game_map, 1)
+        field_workers = workers.FieldWorkers(game_map, 1)
+
+        def serial():
+            for owner, strength in frames:
+                game_map.set_frame(owner, strength)
+                costs.update()
+                field.update()
+                influence_map.update()
+
+        def parallel():
+            for owner, strength in frames:
+                game_map.set_frame(owner, strength)
+                field_workers.start_frame()
+                costs.update()
+                field_workers.result('grassfire')
+                field_workers.result('influence')
+
+        # one pass each first, so the timed passes start from a frame the fields have seen
+        for name, func in (('serial', serial), ('worker processes', parallel)):
+            func()
+            report(name, size, timeit.timeit(func, number=repeat), repeat * len(frames))
+        field_workers.close()
+
+
+def bench_selfplay(sizes, repeat):
+    "Whole MyBot vs MyBot games through engine.run_game with in-process bots; time per bot turn."
+    for size in sizes:
+        bots = [engine.InProcessBot(MyBot.Bot.from_arrays, 'MyBot') for _ in range(2)]
+        result = engine.run_game(size, size, bots, seed=size, timeouts=False, replay_dir=None, quiet=True)
+        times = [seconds for bot_times in result['turn_times'] for seconds in bot_times]
+        report('in-process bot turn', size, sum(times), len(times))
+
+
+def bench_area(sizes, repeat):
+    """
+    Per-turn latency against map area, in MyBot vs MyBot games: mean and worst turn, and the mean turn per 1000 tiles.
+    Sizes beyond the Halite ones show the trend, e.g. --sizes 30 50 70 90.
+    """
+    for size in sizes:
+        bots = [engine.InProcessBot(MyBot.Bot.from_arrays, 'MyBot') for _ in range(2)]
+        result = engine.run_game(size, size, bots, seed=size, timeouts=False, replay_dir=None, quiet=True)
+        times = [seconds for bot_times in result['turn_times'] for seconds in bot_times]
+        report('mean turn', size, sum(times), len(times))
+        report('worst turn', size, max(times), 1)
+        report('mean turn per 1000 tiles', size, sum(times) * 1000 / (size * size), len(times))
+
+
+BENCHMARKS = {
+    'area': bench_area,
+    'decode': bench_decode,
+    'distance': bench_distance,
+    'forward': bench_forward,
+    'grassfire': bench_grassfire,
+    'incremental': bench_incremental,
+    'influence': bench_influence,
+    'neighbors': bench_neighbors,
+    'routing': bench_routing,
+    'search': bench_search,
+    'selfplay': bench_selfplay,
+    'workers': bench_workers,
+    'gamemap': bench_gamemap,
+}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    # checked below rather than with choices, which argparse also applies to the empty list of a bare run
+    parser.add_argument('benchmarks', nargs='*', help='any of: ' + ', '.join(sorted(BENCHMARKS)) + ' (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=MAP_SIZES)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmarks: ' + ', '.join(unknown))
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        print('== {} =='.format(name))
+        BENCHMARKS[name](args.sizes, args.repeat)
@@ -0,0 +1,346 @@
+"""
+A headless Halite 2016 engine in pure Python / NumPy.
+
+It speaks the same stdin/stdout protocol as the official `halite` binary and takes the same basic arguments, so local
+matches also run on machines where the bundled (macOS) binary does not:
+
+    python3 engine.py -d "34 34" -s 123 "python3 MyBot.py" "python3 RandomBot.py"
+
+The rules follow the 2016 game: squares that stay STILL gain their production, squares that move leave a strength 0
+square behind, squares of one player moving onto the same tile merge (capped at 255), and every piece damages all
+enemy pieces on its own and the 4 adjacent tiles by its strength (overkill), while neutral tiles only fight pieces
+that move onto them.  A bot that crashes or runs out of
+time is ejected and its squares turn neutral.  A replay is written as a .hlt file for the Halite visualizer.
+"""
+
+import argparse
+import json
+import os
+import random
+import select
+import shlex
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import hlt
+from hlt import STILL
+
+INIT_TIMEOUT = 15.0
+TURN_TIMEOUT = 1.0
+REPLAY_VERSION = 11
+# players are laid out on a grid of identical map chunks
+PLAYER_GRID = {1: (1, 1), 2: (2, 1), 3: (3, 1), 4: (2, 2), 5: (5, 1), 6: (3, 2)}
+
+
+def max_turns(width, height):
+    "Number of turns after which the game ends, as in the 2016 environment."
+    return int(10 * (width * height) ** 0.5)
+
+
+def smooth_noise(rng, height, width, passes):
+    "Uniform noise blurred with a wrapping box filter and rescaled to [0, 1]."
+    noise = rng.rand(height, width)
+    for _ in range(passes):
+        noise = sum(np.roll(noise, shift, axis) for shift, axis in ((0, 0), (1, 0), (-1, 0), (1, 1), (-1, 1))) / 5
+    return (noise - noise.min()) / max(noise.max() - noise.min(), 1e-9)
+
+
+def generate_map(width, height, num_players, seed):
+    """
+    Returns flat (owner, strength, production) arrays for a seeded starting map.
+
+    One chunk of smooth production and strength noise is tiled once per player, so every player starts from the same
+    surroundings (up to cropping when the chunks do not divide the map evenly), on a single square of strength 255.
+    """
+    rng = np.random.RandomState(seed)
+    cols, rows = PLAYER_GRID[num_players]
+    chunk_width, chunk_height = -(-width // cols), -(-height // rows)
+    production = np.round(smooth_noise(rng, chunk_height, chunk_width, 3) ** 1.5 * 15)
+    strength = np.round(smooth_noise(rng, chunk_height, chunk_width, 3) * 255)
+    production = np.tile(production, (rows, cols))[:height, :width].astype(np.int32).ravel()
+    strength = np.tile(strength, (rows, cols))[:height, :width].astype(np.int32).ravel()
+
+    owner = np.zeros(width * height, dtype=np.int32)
+    start_x = rng.randint(min(chunk_width, width - (cols - 1) * chunk_width))
+    start_y = rng.randint(min(chunk_height, height - (rows - 1) * chunk_height))
+    for player in range(num_players):
+        x = start_x + (player % cols) * chunk_width
+        y = start_y + (player // cols) * chunk_height
+        owner[y * width + x] = player + 1
+        strength[y * width + x] = 255
+    return owner, strength, production
+
+
+def box_sum(values, columns):
+    "Sums every row of a (players, N) array over each tile and its neighbors given as (5, N) columns."
+    total = np.empty_like(values)
+    for row, out in zip(values, total):
+        out[:] = row.take(columns[0])
+        for column in columns[1:]:
+            out += row.take(column)
+    return total
+
+
+def simulate_turn(owner, strength, production, directions, neighbors, num_players):
+    """
+    Plays one turn on flat arrays and returns the new (owner, strength).
+
+    directions holds the move of every tile in this framework's indexing (NORTH..STILL); entries of neutral tiles are
+    ignored.  neighbors is the (N, 5) NORTH, EAST, SOUTH, WEST, STILL table of hlt.neighbor_table.
+    """
+    size = len(owner)
+    owned = owner > 0
+    strength = np.where(owned & (directions == STILL), np.minimum(strength + production, 255), strength)
+    # a no-op for tables that are transposed views of a (5, N) array
+    columns = np.ascontiguousarray(neighbors.T)
+    # the neutral map once every player's pieces have been lifted off it
+    neutral = np.where(owned, 0, strength)
+
+    # one bincount over (player, destination) for the pieces of all players
+    squares = np.flatnonzero(owned)
+    slots = (owner[squares] - 1) * size + columns[directions[squares], squares]
+    pieces = np.minimum(np.bincount(slots, weights=strength[squares], minlength=num_players * size), 255)
+    pieces = pieces.astype(np.int32).reshape(num_players, size)
+    present = np.bincount(slots, minlength=num_players * size).reshape(num_players, size) > 0
+    # squares moving away leave a strength 0 piece behind, so territory is only lost in combat
+    present[owner[squares] - 1, squares] = True
+
+    # every piece hits all enemy pieces on its tile and the 4 adjacent ones; the tile's neutral strength only hits
+    # the pieces that moved onto it
+    dealt = box_sum(pieces, columns)
+    reached = box_sum(present.astype(np.int8), columns)
+    on_neutral = neutral > 0
+    damage = dealt.sum(axis=0) - dealt + np.where(on_neutral, neutral, 0)
+    hit = (reached.sum(axis=0) - reached > 0) | on_neutral
+    survives = present & ~(hit & (damage >= pieces))
+
+    neutral_damage = np.where(present, pieces, 0).sum(axis=0)
+    new_owner = np.zeros(size, dtype=np.int32)
+    new_strength = np.where(neutral_damage >= neutral, 0, neutral - neutral_damage).astype(np.int32)
+    for player in range(num_players):
+        new_owner[survives[player]] = player + 1
+        new_strength[survives[player]] = (pieces[player] - damage[player])[survives[player]]
+    return new_owner, new_strength
+
+
+def encode_frame(owner, strength):
+    "Encodes flat owner and strength arrays as a frame line of the Halite protocol."
+    starts = np.concatenate(([0], np.flatnonzero(owner[1:] != owner[:-1]) + 1))
+    counts = np.diff(np.append(starts, len(owner)))
+    runs = np.stack((counts, owner[starts]), axis=1).ravel()
+    return ' '.join(map(str, runs.tolist() + strength.tolist()))
+
+
+def decode_moves(line, owner, player, width, directions):
+    "Applies a move line of the Halite protocol to directions, ignoring moves of squares the player does not own."
+    values = hlt.parse_ints(line)
+    for x, y, direction in values[:len(values) - len(values) % 3].reshape(-1, 3).tolist():
+        if 0 <= x < width and 0 <= y < len(owner) // width and 0 <= direction <= 4 and owner[y * width + x] == player:
+            # undo hlt.translate_cardinal
+            directions[y * width + x] = (direction + 4) % 5
+
+
+class BotTimeout(Exception):
+    pass
+
+
+class BotProcess:
+    "A bot subprocess talking the Halite protocol over pipes, with per-message time limits."
+
+    def __init__(self, command):
+        self.command = command
+        self.process = subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        self.buffer = b''
+        self.name = command
+        self.turn_times = []
+
+    def send(self, line):
+        self.process.stdin.write(line.encode() + b'\n')
+        self.process.stdin.flush()
+
+    def receive(self, timeout):
+        "Returns the next line of the bot, raising BotTimeout if it takes longer than timeout seconds (None: no limit)."
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        fd = self.process.stdout.fileno()
+        while b'\n' not in self.buffer:
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                raise BotTimeout(self.command)
+            if not select.select([fd], [], [], remaining)[0]:
+                raise BotTimeout(self.command)
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                raise EOFError(self.command)
+            self.buffer += chunk
+        line, _, self.buffer = self.buffer.partition(b'\n')
+        return line.decode().strip()
+
+    def start(self, player, width, height, production, owner, strength, frame_string, timeout):
+        "Sends the init messages and waits for the bot's name."
+        self.width = width
+        self.send(str(player))
+        self.send('{} {}'.format(width, height))
+        self.send(' '.join(map(str, production.tolist())))
+        self.send(frame_string)
+        self.name = self.receive(timeout) or self.command
+
+    def play(self, player, owner, strength, frame_string, directions, timeout):
+        "Sends a frame and applies the bot's moves to directions."
+        start = time.perf_counter()
+        self.send(frame_string)
+        line = self.receive(timeout)
+        self.turn_times.append(time.perf_counter() - start)
+        decode_moves(line, owner, player, self.width, directions)
+
+    def kill(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+
+
+class InProcessBot:
+    """
+    A bot living in this process, skipping the text protocol.  factory(player, production, owner, strength) gets
+    (height, width) arrays and must return an object whose get_directions(owner, strength) returns a flat array of
+    moves in this framework's indexing, e.g. InProcessBot(MyBot.Bot.from_arrays, 'MyBot').
+    """
+
+    def __init__(self, factory, name):
+        self.factory = factory
+        self.name = name
+        self.turn_times = []
+
+    def start(self, player, width, height, production, owner, strength, frame_string, timeout):
+        start = time.perf_counter()
+        self.bot = self.factory(player, production.reshape(height, width), owner.reshape(height, width),
+                                strength.reshape(height, width))
+        if timeout is not None and time.perf_counter() - start > timeout:
+            raise BotTimeout(self.name)
+
+    def play(self, player, owner, strength, frame_string, directions, timeout):
+        start = time.perf_counter()
+        moves = self.bot.get_directions(owner, strength)
+        self.turn_times.append(time.perf_counter() - start)
+        if timeout is not None and self.turn_times[-1] > timeout:
+            raise BotTimeout(self.name)
+        mine = owner == player
+        directions[mine] = moves[mine]
+
+    def kill(self):
+        pass
+
+
+def run_game(width, height, commands, seed=None, timeouts=True, replay_dir='.', quiet=False):
+    """
+    Plays one game between the given bots, each a command line or an InProcessBot, and returns a result dict with the
+    players' names, ranks, last frames alive and per-turn latencies, plus the replay path (None if replay_dir is None).
+    """
+    if seed is None:
+        seed = random.randrange(1 << 31)
+    num_players = len(commands)
+    owner, strength, production = generate_map(width, height, num_players, seed)
+    neighbors = hlt.neighbor_table(width, height, hlt.DIRECTION_OFFSETS)
+    init_timeout = INIT_TIMEOUT if timeouts else None
+    turn_timeout = TURN_TIMEOUT if timeouts else None
+
+    bots = [BotProcess(command) if isinstance(command, str) else command for command in commands]
+    alive = [True] * num_players
+    last_frame = [0] * num_players
+    frame_string = encode_frame(owner, strength)
+    for player, bot in enumerate(bots):
+        try:
+            bot.start(player + 1, width, height, production, owner, strength, frame_string, init_timeout)
+        except (BotTimeout, EOFError, BrokenPipeError):
+            alive[player] = False
+            bot.kill()
+            owner[owner == player + 1] = 0
+
+    frames = [(owner, strength)]
+    moves = []
+    for turn in range(1, max_turns(width, height) + 1):
+        if sum(alive) <= 1:
+            break
+        frame_string = encode_frame(owner, strength)
+        directions = np.full(width * height, STILL, dtype=np.int64)
+        for player, bot in enumerate(bots):
+            if not alive[player]:
+                continue
+            try:
+                bot.play(player + 1, owner, strength, frame_string, directions, turn_timeout)
+            except (BotTimeout, EOFError, BrokenPipeError):
+                alive[player] = False
+                bot.kill()
+                owner = np.where(owner == player + 1, 0, owner)
+                if not quiet:
+                    print('Player #{}, {}, was ejected on frame #{}'.format(player + 1, bot.name, turn))
+
+        moves.append(np.where(owner > 0, (directions + 1) % 5, 0))
+        owner, strength = simulate_turn(owner, strength, production, directions, neighbors, num_players)
+        frames.append((owner, strength))
+        territory = np.bincount(owner, minlength=num_players + 1)
+        for player in range(num_players):
+            if alive[player]:
+                if territory[player + 1] > 0:
+                    last_frame[player] = turn
+                else:
+                    alive[player] = False
+                    bots[player].kill()
+    for bot in bots:
+        bot.kill()
+
+    territory = np.bincount(owner, minlength=num_players + 1)
+    order = sorted(range(num_players), key=lambda p: (-last_frame[p], -territory[p + 1]))
+    ranks = [order.index(player) + 1 for player in range(num_players)]
+
+    replay_path = None
+    if replay_dir is not None:
+        replay_path = os.path.join(replay_dir, '{}-{}.hlt'.format(int(time.time()) % 1000000, seed))
+        write_replay(replay_path, width, height, [bot.name for bot in bots], production, frames, moves)
+
+    result = {'seed': seed, 'width': width, 'height': height, 'names': [bot.name for bot in bots],
+              'ranks': ranks, 'last_frames': last_frame, 'frames': len(frames), 'replay': replay_path,
+              'turn_times': [bot.turn_times for bot in bots]}
+    if not quiet:
+        print('Map seed was {}'.format(seed))
+        if replay_path is not None:
+            print('Opening a file at {}'.format(replay_path))
+        for player, bot in enumerate(bots):
+            times = bot.turn_times or [0]
+            print('Player #{}, {}, came in rank #{} and was last alive on frame #{}! '
+                  '(mean {:.1f} ms, max {:.1f} ms per turn)'.format(player + 1, bot.name, ranks[player],
+                                                                    last_frame[player], 1000 * np.mean(times),
+                                                                    1000 * max(times)))
+    return result
+
+
+def write_replay(path, width, height, names, production, frames, moves):
+    "Writes a .hlt replay in the format of the 2016 Halite visualizer."
+    def grid(array):
+        return array.reshape(height, width).tolist()
+
+    replay = {'version': REPLAY_VERSION, 'width': width, 'height': height, 'num_players': len(names),
+              'num_frames': len(frames), 'player_names': names, 'productions': grid(production),
+              'frames': [np.stack((grid(owner), grid(strength)), axis=-1).tolist() for owner, strength in frames],
+              'moves': [grid(directions) for directions in moves]}
+    with open(path, 'w') as f:
+        json.dump(replay, f, separators=(',', ':'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-d', '--dimensions', default='30 30', help='map size as "width height"')
+    parser.add_argument('-s', '--seed', type=int, default=None)
+    parser.add_argument('-t', '--no-timeout', action='store_true', help='disable the init and turn time limits')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    parser.add_argument('-o', '--replay-dir', default='.')
+    parser.add_argument('bots', nargs='+', help='bot commands, e.g. "python3 MyBot.py"')
+    args = parser.parse_args()
+    if not 1 <= len(args.bots) <= 6:
+        sys.exit('between 1 and 6 bots are supported')
+    width, height = map(int, args.dimensions.split())
+    run_game(width, height, args.bots, seed=args.seed, timeouts=not args.no_timeout, replay_dir=args.replay_dir,
+             quiet=args.quiet)
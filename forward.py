@@ -0,0 +1,69 @@
+"""
+One-step forward model of the bot's own moves.
+
+Candidate direction arrays for our squares are played through engine.simulate_turn, the same rules the local engine
+uses (movement, the 255 merge cap, production of STILL squares and overkill damage).  K candidates are simulated in
+a single call by laying K copies of the board side by side as one map of K * N tiles whose neighbor table never
+crosses from one copy into another.  Arrays are flat like in pathing.py; candidates are (K, N).
+"""
+
+import numpy as np
+
+import engine
+from hlt import STILL
+
+
+class ForwardModel:
+    "Predicts the next frame of the current map for candidate move sets of player my_id."
+
+    def __init__(self, game_map, my_id):
+        self.game_map = game_map
+        self.my_id = my_id
+        self.neighbors = game_map.neighbor_table
+        self.production = game_map.production.ravel()
+        self._stacked_neighbors = {}
+
+    def stacked_neighbors(self, k):
+        "The (k * N, 5) neighbor table of k side-by-side copies of the map."
+        if k not in self._stacked_neighbors:
+            size = len(self.neighbors)
+            # stored column by column, the layout engine.simulate_turn reads it in
+            columns = self.neighbors.T[:, None, :] + size * np.arange(k)[None, :, None]
+            self._stacked_neighbors[k] = np.ascontiguousarray(columns.reshape(5, -1)).T
+        return self._stacked_neighbors[k]
+
+    def directions(self, candidates, others=None):
+        "The (K, N) directions of every tile: ours from the candidates, the others' from others (STILL by default)."
+        owner = self.game_map.owner.ravel()
+        others = np.full(len(owner), STILL, dtype=np.int64) if others is None else np.asarray(others, dtype=np.int64)
+        return np.where(owner == self.my_id, np.atleast_2d(candidates), others)
+
+    def simulate(self, candidates, others=None):
+        "Returns the predicted (owner, strength) of every candidate, both (K, N)."
+        directions = self.directions(candidates, others)
+        k, size = directions.shape
+        owner, strength = self.game_map.owner.ravel(), self.game_map.strength.ravel()
+        num_players = max(int(owner.max()), self.my_id)
+        new_owner, new_strength = engine.simulate_turn(np.tile(owner, k), np.tile(strength, k),
+                                                       np.tile(self.production, k), directions.ravel(),
+                                                       self.stacked_neighbors(k), num_players)
+        return new_owner.reshape(k, size), new_strength.reshape(k, size)
+
+    def score(self, candidates, others=None):
+        """
+        Scores every candidate by (strength lost, enemy strength destroyed, territory gained), each a (K,) array.
+
+        Strength counts after the production of the STILL squares, so what is lost or destroyed is whatever is gone
+        after the turn, be it to combat or to the merge cap.
+        """
+        directions = self.directions(candidates, others)
+        owner, strength = self.game_map.owner.ravel(), self.game_map.strength.ravel()
+        new_owner, new_strength = self.simulate(candidates, others)
+        mine, enemy = owner == self.my_id, (owner != 0) & (owner != self.my_id)
+        grown = np.where(directions == STILL, np.minimum(strength + self.production, 255), strength)
+        new_mine = new_owner == self.my_id
+        new_enemy = (new_owner != 0) & ~new_mine
+        lost = np.where(mine, grown, 0).sum(axis=1) - np.where(new_mine, new_strength, 0).sum(axis=1)
+        destroyed = np.where(enemy, grown, 0).sum(axis=1) - np.where(new_enemy, new_strength, 0).sum(axis=1)
+        gained = new_mine.sum(axis=1) - mine.sum()
+        return lost, destroyed, gained
@@ -11,6 +11,8 @@ import sys
 from collections import namedtuple
 from itertools import chain, zip_longest
 
+import numpy as np
+
 
 def grouper(iterable, n, fillvalue=None):
     "Collect data into fixed-length chunks or blocks"
@@ -32,6 +34,9 @@ def opposite_cardinal(direction):
 
 Square = namedtuple('Square', 'x y owner strength production')
 
+# (dx, dy) for NORTH, EAST, SOUTH, WEST, STILL
+DIRECTION_OFFSETS = ((0, -1), (1, 0), (0, 1), (-1, 0), (0, 0))
+
 
 Move = namedtuple('Move', 'square direction')
 
@@ -39,7 +44,7 @@ Move = namedtuple('Move', 'square direction')
 class GameMap:
     def __init__(self, size_string, production_string, map_string=None):
         self.width, self.height = tuple(map(int, size_string.split()))
-        self.production = tuple(tuple(map(int, substring)) for substring in grouper(production_string.split(), self.width))
+        self.production = tuple(grouper(parse_ints(production_string).tolist(), self.width))
         self.contents = None
         self.get_frame(map_string)
         self.starting_player_count = len(set(square.owner for square in self)) - 1
@@ -48,20 +53,13 @@ class GameMap:
         "Updates the map information from the latest frame provided by the Halite game environment."
         if map_string is None:
             map_string = get_string()
-        split_string = map_string.split()
-        owners = list()
-        while len(owners) < self.width * self.height:
-            counter = int(split_string.pop(0))
-            owner = int(split_string.pop(0))
-            owners.extend([owner] * counter)
-        assert len(owners) == self.width * self.height
-        assert len(split_string) == self.width * self.height
+        owners, strengths = decode_frame(map_string, self.width * self.height)
         self.contents = [[Square(x, y, owner, strength, production)
                           for x, (owner, strength, production)
                           in enumerate(zip(owner_row, strength_row, production_row))]
                          for y, (owner_row, strength_row, production_row)
-                         in enumerate(zip(grouper(owners, self.width),
-                                          grouper(map(int, split_string), self.width),
+                         in enumerate(zip(grouper(owners.tolist(), self.width),
+                                          grouper(strengths.tolist(), self.width),
                                           self.production))]
 
     def __iter__(self):
@@ -128,6 +126,204 @@ class GameMap:
         dy = min(abs(sq1.y - sq2.y), sq1.y + self.height - sq2.y, sq2.y + self.height - sq1.y)
         return dx, dy, dx + dy
 
+
+class ArrayGameMap(GameMap):
+    """
+    GameMap variant that keeps owner, strength and production in contiguous NumPy arrays of shape (height, width).
+
+    Vectorized callers read self.owner, self.strength and self.production directly.  Square namedtuples are only
+    built when a caller iterates over the map or asks for a neighbor / target, and are then cached until the next frame.
+    """
+
+    def __init__(self, size_string, production_string, map_string=None):
+        width, height = tuple(map(int, size_string.split()))
+        self._init_tables(width, height, parse_ints(production_string))
+        self.get_frame(map_string)
+        self.starting_player_count = len(np.unique(self.owner)) - 1
+
+    @classmethod
+    def from_arrays(cls, production, owner, strength):
+        "Builds a map from (height, width) production, owner and strength arrays instead of protocol strings."
+        game_map = cls.__new__(cls)
+        height, width = np.shape(production)
+        game_map._init_tables(width, height, np.asarray(production, dtype=np.int32))
+        game_map.set_frame(owner, strength)
+        game_map.starting_player_count = len(np.unique(game_map.owner)) - 1
+        return game_map
+
+    def _init_tables(self, width, height, production):
+        self.width, self.height = width, height
+        self.production = production.reshape(self.height, self.width)
+        self.owner = None
+        self.strength = None
+        self._squares = None
+        # frame number and flat indices of the tiles that changed in the last set_frame()
+        self.frame = 0
+        self.changed = None
+        # coordinates and production never change, so their Python lists are built once
+        self._xs = list(range(self.width)) * self.height
+        self._ys = [y for y in range(self.height) for _ in range(self.width)]
+        self._production_list = self.production.ravel().tolist()
+        # flat indices of the NORTH, EAST, SOUTH, WEST and STILL neighbors of every tile, shape (N, 5)
+        self.neighbor_table = neighbor_table(self.width, self.height, DIRECTION_OFFSETS)
+        self._radius_tables = {1: self.neighbor_table}
+        # Python lists of the same tables for the per-square loops, keyed by (n, include_self)
+        self._neighbor_lists = {(1, True): self.neighbor_table.tolist(),
+                                (1, False): self.neighbor_table[:, :4].tolist()}
+        # per-axis torus distance and direction of approach, [from][to]; uint8 is enough at Halite sizes
+        self.x_distance, self.x_direction = axis_tables(self.width, EAST, WEST)
+        self.y_distance, self.y_direction = axis_tables(self.height, SOUTH, NORTH)
+        self._x_distance_list, self._y_distance_list = self.x_distance.tolist(), self.y_distance.tolist()
+        self._flat_x = np.arange(self.width * self.height) % self.width
+        self._flat_y = np.arange(self.width * self.height) // self.width
+
+    def get_frame(self, map_string=None):
+        "Updates the owner and strength arrays from the latest frame provided by the Halite game environment."
+        if map_string is None:
+            map_string = get_bytes()
+        self.set_frame(*decode_frame(map_string, self.width * self.height))
+
+    def set_frame(self, owner, strength):
+        "Updates the owner and strength arrays directly, flat or shaped (height, width)."
+        # copies, so a caller reusing its arrays for the next frame cannot hide what changed
+        owner = np.array(owner, dtype=np.int32).reshape(self.height, self.width)
+        strength = np.array(strength, dtype=np.int32).reshape(self.height, self.width)
+        if self.owner is not None:
+            self.changed = np.flatnonzero((owner != self.owner) | (strength != self.strength))
+        self.owner, self.strength = owner, strength
+        self.frame += 1
+        self._squares = None
+
+    def changes_since(self, frame):
+        """
+        Flat indices of the tiles whose owner or strength changed since the given frame number, or None if that is
+        not the previous frame, in which case the caller has to rebuild from scratch.
+        """
+        return self.changed if frame == self.frame - 1 else None
+
+    @property
+    def squares(self):
+        "Flat, row-major list of Squares for the current frame; built on first access."
+        if self._squares is None:
+            self._squares = list(map(Square, self._xs, self._ys, self.owner.ravel().tolist(),
+                                     self.strength.ravel().tolist(), self._production_list))
+        return self._squares
+
+    @property
+    def contents(self):
+        "Rows of Squares, for callers written against the plain GameMap."
+        squares, width = self.squares, self.width
+        return [squares[y * width:(y + 1) * width] for y in range(self.height)]
+
+    def __iter__(self):
+        return iter(self.squares)
+
+    def square(self, x, y):
+        "Returns the Square at (x, y)."
+        return self.squares[y * self.width + x]
+
+    def index(self, square):
+        "Returns the flat, row-major index of a square."
+        return square.y * self.width + square.x
+
+    def radius_table(self, n):
+        "Returns the (N, k) flat-index table of every tile's n-distance neighborhood, in GameMap.neighbors order."
+        if n not in self._radius_tables:
+            self._radius_tables[n] = neighbor_table(self.width, self.height, radius_offsets(n))
+        return self._radius_tables[n]
+
+    def neighbor_indices(self, i, n=1, include_self=False):
+        "Flat-index counterpart of neighbors(): the indices of the n-distance neighbors of the tile at index i."
+        key = (n, include_self)
+        if key not in self._neighbor_lists:
+            table = self.radius_table(n)
+            if not include_self:
+                # the tile itself sits in the middle of the radius ordering
+                table = np.delete(table, table.shape[1] // 2, axis=1)
+            self._neighbor_lists[key] = table.tolist()
+        return self._neighbor_lists[key][i]
+
+    def target_index(self, i, direction):
+        "Flat-index counterpart of get_target()."
+        return self._neighbor_lists[1, True][i][direction]
+
+    def get_distance(self, sq1, sq2):
+        return self._x_distance_list[sq1.x][sq2.x] + self._y_distance_list[sq1.y][sq2.y]
+
+    def get_distance_2(self, sq1, sq2):
+        dx, dy = self._x_distance_list[sq1.x][sq2.x], self._y_distance_list[sq1.y][sq2.y]
+        return dx, dy, dx + dy
+
+    def distances(self, i, indices):
+        "Distances from the tile at flat index i to the tiles at an array of flat indices."
+        xs, ys = self._flat_x[indices], self._flat_y[indices]
+        return np.add(self.x_distance[self._flat_x[i], xs], self.y_distance[self._flat_y[i], ys], dtype=np.int32)
+
+    def distance_matrix(self, sources, targets):
+        "(len(sources), len(targets)) distances between two arrays of flat indices."
+        sources, targets = np.asarray(sources), np.asarray(targets)
+        dx = self.x_distance[self._flat_x[sources][:, None], self._flat_x[targets]]
+        dy = self.y_distance[self._flat_y[sources][:, None], self._flat_y[targets]]
+        return np.add(dx, dy, dtype=np.int32)
+
+    def approach_directions(self, sources, targets):
+        """
+        Direction of the first step from every source to the target at the same position of targets, along the
+        axis with the larger distance (the y axis on ties), as the original find_nearest_direction stepped.
+        """
+        sx, sy = self._flat_x[sources], self._flat_y[sources]
+        tx, ty = self._flat_x[targets], self._flat_y[targets]
+        return np.where(self.x_distance[sx, tx] > self.y_distance[sy, ty],
+                        self.x_direction[sx, tx], self.y_direction[sy, ty])
+
+    def neighbors(self, square, n=1, include_self=False):
+        return map(self.squares.__getitem__, self.neighbor_indices(square.y * self.width + square.x, n, include_self))
+
+    def get_target(self, square, direction):
+        return self.squares[self._neighbor_lists[1, True][square.y * self.width + square.x][direction]]
+
+
+def radius_offsets(n):
+    "(dx, dy) offsets of the n-distance neighborhood including (0, 0), in the order GameMap.neighbors yields them."
+    if n == 1:
+        return DIRECTION_OFFSETS
+    return tuple((dx, dy) for dy in range(-n, n+1) for dx in range(-n, n+1) if abs(dx) + abs(dy) <= n)
+
+
+def axis_tables(length, forward, backward):
+    """
+    Returns the (length, length) uint8 tables of the torus distance along one axis and of the direction to step in,
+    forward when going forward is not longer, both indexed [from][to].
+    """
+    ahead = (np.arange(length)[None, :] - np.arange(length)[:, None]) % length
+    distance = np.minimum(ahead, length - ahead).astype(np.uint8)
+    direction = np.where(ahead == distance, forward, backward).astype(np.uint8)
+    return distance, direction
+
+
+def neighbor_table(width, height, offsets):
+    "Returns an (N, len(offsets)) array holding, for every tile, the flat indices of the tiles at the given offsets."
+    xs = np.tile(np.arange(width), height)
+    ys = np.repeat(np.arange(height), width)
+    return np.stack([((ys + dy) % height) * width + (xs + dx) % width for dx, dy in offsets], axis=1)
+
+
+def parse_ints(data):
+    "Parses a line of whitespace-separated integers (bytes or str) into an int32 array in a single pass."
+    return np.fromstring(data, dtype=np.int32, sep=' ')
+
+
+def decode_frame(data, size):
+    "Decodes a frame line into flat, row-major owner and strength arrays of the given size."
+    # a frame is the run-length encoded owners as (count, owner) pairs followed by exactly size strengths, so the
+    # number of run tokens is known without walking the runs
+    tokens = parse_ints(data)
+    assert len(tokens) >= size
+    runs = tokens[:-size]
+    owner = np.repeat(runs[1::2], runs[0::2])
+    assert len(owner) == size
+    return owner, tokens[-size:]
+
 #####################################################################################################################
 # Functions for communicating with the Halite game environment (formerly contained in separate module networking.py #
 #####################################################################################################################
@@ -143,9 +339,18 @@ def get_string():
     return sys.stdin.readline().rstrip('\n')
 
 
-def get_init():
-    playerID = int(get_string())
-    m = GameMap(get_string(), get_string())
+def get_bytes():
+    "Reads a raw line from stdin.  A bot should use either get_bytes or get_string, never both."
+    return sys.stdin.buffer.readline()
+
+
+def get_init(use_arrays=False):
+    if use_arrays:
+        playerID = int(get_bytes())
+        m = ArrayGameMap(get_bytes(), get_bytes())
+    else:
+        playerID = int(get_string())
+        m = GameMap(get_string(), get_string())
     return playerID, m
 
 
@@ -166,3 +371,14 @@ def translate_cardinal(direction):
 
 def send_frame(moves):
     send_string(' '.join(str(move.square.x) + ' ' + str(move.square.y) + ' ' + str(translate_cardinal(move.direction)) for move in moves))
+
+
+def format_directions(game_map, tiles, directions):
+    "The moves line for directions[i] of every flat tile index i in tiles."
+    moves = np.stack([tiles % game_map.width, tiles // game_map.width, translate_cardinal(directions[tiles])], axis=1)
+    return ' '.join(map(str, moves.ravel().tolist()))
+
+
+def send_directions(game_map, tiles, directions):
+    "Array counterpart of send_frame(): sends directions[i] for every flat tile index i in tiles."
+    send_string(format_directions(game_map, tiles, directions))
@@ -0,0 +1,131 @@
+"""
+Enemy influence map computed with shifted-array stencils.
+
+A tile is influenced by an enemy square if both sit in the 5-box (the square plus its 4 neighbors) of a common
+"combat" center: a tile that is not a neutral with strength, and whose 5-box holds an empty neutral tile and an enemy.
+Every enemy square is counted once per tile, however many centers it reaches the tile through.
+"""
+
+import numpy as np
+
+BOX = ((0, 0), (0, -1), (1, 0), (0, 1), (-1, 0))
+# offsets of the enemy squares that can reach a tile, and for each of them the centers shared by both 5-boxes
+OFFSETS = tuple((dx, dy) for dy in range(-2, 3) for dx in range(-2, 3) if abs(dx) + abs(dy) <= 2)
+SHARED_CENTERS = tuple(tuple(c for c in BOX if (c[0] - dx, c[1] - dy) in BOX) for dx, dy in OFFSETS)
+# index in OFFSETS of the opposite of every offset
+MIRRORED = [OFFSETS.index((-dx, -dy)) for dx, dy in OFFSETS]
+# columns of hlt.neighbor_table (NORTH, EAST, SOUTH, WEST, STILL) in BOX order
+BOX_COLUMNS = [4, 0, 1, 2, 3]
+# share of the map that may change kind in one frame before InfluenceMap rebuilds instead of repairing
+REBUILD_FRACTION = 0.1
+
+
+def shifted(array, dx, dy):
+    "Returns a copy of a (height, width) array where [y, x] holds array[(y + dy) % height, (x + dx) % width]."
+    return np.roll(array, (-dy, -dx), axis=(0, 1))
+
+
+def box_any(mask):
+    "True where any tile of the 5-box is True."
+    return np.logical_or.reduce([shifted(mask, dx, dy) for dx, dy in BOX])
+
+
+class InfluenceMap:
+    """
+    Per-tile enemy strength sum (self.strength) and number of distinct enemy squares (self.count), as (height, width)
+    arrays.  The contributing squares of a single tile are rebuilt on demand by contributors().
+
+    update() brings the map to the current frame of the game map.  A tile's influence only depends on the tiles
+    within distance 2, so it recomputes just the 2-neighborhoods of the tiles that changed kind (blocked, enemy or
+    empty), with flat-index gathers, and adds the difference to the tiles influenced by enemies that only changed
+    strength.  When more than REBUILD_FRACTION of the map changed kind it rebuilds.
+    """
+
+    def __init__(self, game_map, my_id):
+        self.game_map = game_map
+        self.my_id = my_id
+        # flat indices of the BOX and OFFSETS neighborhoods of every tile
+        self.box_table = game_map.neighbor_table[:, BOX_COLUMNS]
+        self.reach_table = game_map.radius_table(2)
+        self.rebuild()
+
+    def rebuild(self):
+        owner, strength = self.game_map.owner, self.game_map.strength
+        self.blocked = (owner == 0) & (strength > 0)
+        self.enemy = (owner != 0) & (owner != self.my_id)
+        self.empty = (owner == 0) & (strength == 0)
+        self.enemy_strength = np.where(self.enemy, strength, 0)
+        self.centers = ~self.blocked & box_any(self.empty) & box_any(self.enemy)
+
+        # included[k, y, x]: the enemy at OFFSETS[k] from (x, y) influences (x, y)
+        self.included = np.empty((len(OFFSETS),) + owner.shape, dtype=bool)
+        for k, ((dx, dy), shared) in enumerate(zip(OFFSETS, SHARED_CENTERS)):
+            covered = np.logical_or.reduce([shifted(self.centers, cx, cy) for cx, cy in shared])
+            self.included[k] = ~self.blocked & covered & shifted(self.enemy, dx, dy)
+
+        self.strength = np.zeros(owner.shape, dtype=np.int32)
+        for k, (dx, dy) in enumerate(OFFSETS):
+            self.strength += np.where(self.included[k], shifted(strength, dx, dy), 0)
+        self.count = self.included.sum(axis=0)
+        self.frame = self.game_map.frame
+
+    def update(self):
+        if self.frame == self.game_map.frame:
+            return
+        changed = self.game_map.changes_since(self.frame)
+        if changed is None:
+            self.rebuild()
+            return
+        self.frame = self.game_map.frame
+        owner, strength = self.game_map.owner.ravel()[changed], self.game_map.strength.ravel()[changed]
+        blocked = (owner == 0) & (strength > 0)
+        enemy = (owner != 0) & (owner != self.my_id)
+        empty = (owner == 0) & (strength == 0)
+        enemy_strength = np.where(enemy, strength, 0)
+        moved = (blocked != self.blocked.ravel()[changed]) | (enemy != self.enemy.ravel()[changed]) \
+            | (empty != self.empty.ravel()[changed])
+        if moved.sum() > REBUILD_FRACTION * len(self.box_table):
+            self.rebuild()
+            return
+        # enemies that only changed strength add the difference to the tiles they already influence
+        grown = ~moved & enemy
+        if grown.any():
+            self.add_strength(changed[grown], enemy_strength[grown] - self.enemy_strength.ravel()[changed[grown]])
+        self.enemy_strength.ravel()[changed] = enemy_strength
+        if moved.any():
+            changed = changed[moved]
+            self.blocked.ravel()[changed] = blocked[moved]
+            self.enemy.ravel()[changed] = enemy[moved]
+            self.empty.ravel()[changed] = empty[moved]
+            self.repair(changed)
+
+    def add_strength(self, enemies, delta):
+        # the tile at -OFFSETS[k] from an enemy sees it at OFFSETS[k]
+        tiles = self.reach_table[enemies][:, MIRRORED]
+        included = self.included.reshape(len(OFFSETS), -1)[np.arange(len(OFFSETS)), tiles]
+        np.add.at(self.strength.ravel(), tiles[included], np.broadcast_to(delta[:, None], tiles.shape)[included])
+
+    def repair(self, changed):
+        box_table, reach_table = self.box_table, self.reach_table
+        blocked, enemy, centers = self.blocked.ravel(), self.enemy.ravel(), self.centers.ravel()
+        # centers depend on the 5-box, the influence of a tile on centers next to it and enemies 2 away
+        around = np.unique(box_table[changed])
+        box = box_table[around]
+        centers[around] = ~blocked[around] & self.empty.ravel()[box].any(axis=1) & enemy[box].any(axis=1)
+
+        tiles = np.unique(reach_table[changed])
+        reach = reach_table[tiles]
+        included = self.included.reshape(len(OFFSETS), -1)
+        total = np.zeros(len(tiles), dtype=np.int32)
+        for k, shared in enumerate(SHARED_CENTERS):
+            covered = np.logical_or.reduce([centers[box_table[tiles, BOX.index(c)]] for c in shared])
+            included[k, tiles] = ~blocked[tiles] & covered & enemy[reach[:, k]]
+            total += np.where(included[k, tiles], self.enemy_strength.ravel()[reach[:, k]], 0)
+        self.strength.ravel()[tiles] = total
+        self.count.ravel()[tiles] = included[:, tiles].sum(axis=0)
+
+    def contributors(self, x, y):
+        "Returns the enemy Squares influencing the tile at (x, y)."
+        game_map = self.game_map
+        return [game_map.square((x + dx) % game_map.width, (y + dy) % game_map.height)
+                for k, (dx, dy) in enumerate(OFFSETS) if self.included[k, y, x]]
@@ -0,0 +1,70 @@
+"""
+Per-frame counts and histograms of the map.
+
+Strength, production and grassfire distance are small bounded integers, so their distribution over a set of tiles is
+fully described by a bincount over the value range.  Percentile queries then walk the cumulative counts instead of
+sorting a list of values, and give exactly what np.percentile (linear interpolation) gives on those values.
+"""
+
+import numpy as np
+
+# values are in 0..255: strength, production and pathing.MAX_GRASSFIRE_DIST all fit
+HISTOGRAM_SIZE = 256
+
+
+def histogram(values):
+    "Counts of every value in 0..HISTOGRAM_SIZE - 1 of an integer array."
+    return np.bincount(values, minlength=HISTOGRAM_SIZE)
+
+
+def histogram_percentile(counts, q):
+    "np.percentile(values, q) of the values whose histogram is counts."
+    cumulative = np.cumsum(counts)
+    n = int(cumulative[-1])
+    virtual_index = (n - 1) * (q / 100)
+    if virtual_index >= n - 1:
+        previous_index = next_index = n - 1
+    elif virtual_index < 0:
+        previous_index = next_index = 0
+    else:
+        previous_index = int(np.floor(virtual_index))
+        next_index = previous_index + 1
+    # the value at rank r is the first one whose cumulative count exceeds r
+    a, b = np.searchsorted(cumulative, (previous_index, next_index), side='right').tolist()
+    # the same interpolation as numpy's, which stays exact at both ends
+    t = virtual_index - previous_index
+    if t >= 0.5:
+        return b - (b - a) * (1 - t)
+    return a + (b - a) * t
+
+
+class MapStats:
+    "Tile counts of the current frame, plus histograms of fields computed during the turn."
+
+    def __init__(self, game_map, my_id):
+        self.game_map = game_map
+        self.my_id = my_id
+        self.size = game_map.width * game_map.height
+        self.grassfire_counts = None
+
+    def update(self):
+        "One pass over the owner map of the new frame."
+        owner = self.game_map.owner.ravel()
+        self.mine = owner == self.my_id
+        self.neutral = owner == 0
+        self.owner_counts = np.bincount(owner)
+        self.grassfire_counts = None
+
+    def owned_fraction(self, player=None):
+        player = self.my_id if player is None else player
+        return self.owner_counts[player] / self.size if player < len(self.owner_counts) else 0.0
+
+    def neutral_fraction(self):
+        return self.owned_fraction(0)
+
+    def set_grassfire(self, grassfire):
+        "Histogram of the grassfire distances of our squares."
+        self.grassfire_counts = histogram(grassfire[self.mine])
+
+    def grassfire_percentile(self, q):
+        return histogram_percentile(self.grassfire_counts, q)
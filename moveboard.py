@@ -0,0 +1,40 @@
+"""
+Move resolution state of a turn on flat tile indices.
+
+The bot decides its squares one by one and every decision reads what was decided before: how much strength is
+already heading into a tile, and whether a tile has been given a move yet.  MoveBoard keeps both in per-tile arrays
+that are allocated once and cleared every frame, indexed by i = y * width + x like the fields of pathing.py.
+"""
+
+from array import array
+
+import numpy as np
+
+from hlt import STILL
+
+
+class MoveBoard:
+    """
+    self.strength is the strength that ends up in each tile after the moves decided so far, self.direction the
+    direction given to each tile (STILL until decided) and self.decided whether it has been given one.
+
+    They are array.array objects, which are as fast as lists for the scalar reads and writes of the per-square loops;
+    the *_array attributes are NumPy views of the same memory for whole-map operations.
+    """
+
+    def __init__(self, size):
+        self.strength = array('i', [0]) * size
+        self.direction = array('b', [STILL]) * size
+        self.decided = array('b', [0]) * size
+        self.strength_array = np.frombuffer(self.strength, dtype=np.intc)
+        self.direction_array = np.frombuffer(self.direction, dtype=np.int8)
+        self.decided_array = np.frombuffer(self.decided, dtype=np.bool_)
+
+    def reset(self):
+        self.strength_array[:] = 0
+        self.direction_array[:] = STILL
+        self.decided_array[:] = False
+
+    def assign(self, i, direction):
+        self.direction[i] = direction
+        self.decided[i] = 1
@@ -0,0 +1,176 @@
+"""
+Array-based path planning on the Halite torus.
+
+Every field in this module is a flat, row-major NumPy array indexed by i = y * width + x, so the owner and strength
+arrays of an ArrayGameMap can be passed in with .ravel() and the results reshaped to (height, width) if needed.
+Neighbors come from the flat-index tables the map builds at init, e.g. game_map.neighbor_table[:, :4].
+"""
+
+import numpy as np
+
+from hlt import NORTH, EAST, SOUTH, WEST
+
+MAX_GRASSFIRE_DIST = 255
+# tile kinds of the grassfire, and the internal distance of tiles the wave does not reach
+PASSABLE, ENEMY, BLOCKED = range(3)
+UNREACHED = 1 << 20
+# share of the map that may change kind in one frame before GrassfireField rebuilds instead of repairing
+REBUILD_FRACTION = 0.05
+
+
+def grassfire(owner, strength, my_id, neighbors):
+    """
+    Multi-source grassfire (wavefront) distance towards the enemy, given the (N, 4) torus neighbor table.
+
+    Enemy tiles get 1 and neutral tiles with strength get MAX_GRASSFIRE_DIST.  Our tiles and empty neutral tiles are
+    flooded breadth-first from the ones touching an enemy, which get 2; the ones the wave never reaches keep 0.
+    """
+    enemy = (owner != 0) & (owner != my_id)
+    dist = np.where((owner == 0) & (strength > 0), MAX_GRASSFIRE_DIST, enemy.astype(np.int32))
+    unvisited = dist == 0
+    frontier = np.flatnonzero(unvisited & enemy[neighbors].any(axis=1))
+    level = 2
+    while len(frontier) > 0:
+        dist[frontier] = level
+        unvisited[frontier] = False
+        candidates = neighbors[frontier].ravel()
+        frontier = np.unique(candidates[unvisited[candidates]])
+        level += 1
+    return dist
+
+
+def tile_kinds(owner, strength, my_id):
+    "PASSABLE, ENEMY or BLOCKED (neutral with strength) for every tile, the only thing grassfire depends on."
+    kinds = np.where((owner != 0) & (owner != my_id), ENEMY, PASSABLE)
+    kinds[(owner == 0) & (strength > 0)] = BLOCKED
+    return kinds
+
+
+class GrassfireField:
+    """
+    The grassfire of pathing.grassfire, kept up to date from frame to frame by update().
+
+    Internally every tile holds its wave distance, with unreached and blocked tiles at UNREACHED.  Only tiles whose
+    kind changed matter, and after those the repair touches the tiles whose shortest path led through them (they are
+    reset) and then relaxes distances outwards from the reset and new enemy tiles.  When more than
+    REBUILD_FRACTION of the map changed kind, or frames were missed, the field is rebuilt from scratch instead.
+
+    A moving front can shift the distances of whole regions behind it, and then the repair costs more than the
+    rebuild.  So once a repair rewrites more than REBUILD_FRACTION of the map, the next frames rebuild, and the
+    field goes back to repairing once a rebuild shows that few distances changed.
+    """
+
+    def __init__(self, game_map, my_id, neighbors):
+        self.game_map = game_map
+        self.my_id = my_id
+        self.neighbors = neighbors
+        self.rebuild()
+
+    def rebuild(self):
+        owner, strength = self.game_map.owner.ravel(), self.game_map.strength.ravel()
+        self.kinds = tile_kinds(owner, strength, self.my_id)
+        dist = grassfire(owner, strength, self.my_id, self.neighbors)
+        self.wave = np.where((self.kinds == BLOCKED) | (dist == 0), UNREACHED, dist)
+        self.frame = self.game_map.frame
+        self.repairing = True
+
+    def update(self):
+        "Brings the field to the current frame of the map and returns it in the encoding of pathing.grassfire."
+        if self.frame != self.game_map.frame:
+            changed = self.game_map.changes_since(self.frame)
+            if changed is None:
+                self.rebuild()
+            else:
+                owner, strength = self.game_map.owner.ravel(), self.game_map.strength.ravel()
+                kinds = tile_kinds(owner[changed], strength[changed], self.my_id)
+                moved = kinds != self.kinds[changed]
+                limit = REBUILD_FRACTION * len(self.kinds)
+                if not moved.any():
+                    pass
+                elif self.repairing and moved.sum() <= limit:
+                    self.repairing = self.repair(changed[moved], kinds[moved]) <= limit
+                else:
+                    previous = self.wave
+                    self.rebuild()
+                    self.repairing = np.count_nonzero(self.wave != previous) <= limit
+                self.frame = self.game_map.frame
+        return self.distances()
+
+    def distances(self):
+        return np.where(self.kinds == BLOCKED, MAX_GRASSFIRE_DIST, np.where(self.wave == UNREACHED, 0, self.wave))
+
+    def repair(self, tiles, kinds):
+        "Applies the kind changes of tiles and returns about how many distances it had to rewrite."
+        neighbors, wave = self.neighbors, self.wave
+        self.kinds[tiles] = kinds
+        passable = self.kinds == PASSABLE
+        wave[tiles] = np.where(kinds == ENEMY, 1, UNREACHED)
+        reset = np.zeros(len(wave), dtype=bool)
+        reset[tiles[kinds == PASSABLE]] = True
+
+        # 1: reset every passable tile left without a neighbor closer to an enemy, wave by wave; the tiles kept are
+        # at most their current distance away, as their chain of closer neighbors still reaches an enemy
+        frontier = tiles
+        while len(frontier) > 0:
+            candidates = np.unique(neighbors[frontier].ravel())
+            candidates = candidates[passable[candidates] & ~reset[candidates] & (wave[candidates] < UNREACHED)]
+            around = neighbors[candidates]
+            supported = ((wave[around] < wave[candidates, None]) & ~reset[around]).any(axis=1)
+            frontier = candidates[~supported]
+            reset[frontier] = True
+            wave[frontier] = UNREACHED
+
+        # 2: the reset tiles start from their best neighbor, then decreases spread outwards
+        reset = np.flatnonzero(reset)
+        rewritten = len(reset)
+        wave[reset] = np.minimum(wave[neighbors[reset]].min(axis=1) + 1, UNREACHED)
+        frontier = np.concatenate([reset[wave[reset] < UNREACHED], tiles[kinds == ENEMY]])
+        while len(frontier) > 0:
+            targets = neighbors[frontier].ravel()
+            values = np.repeat(wave[frontier] + 1, neighbors.shape[1])
+            better = passable[targets] & (values < wave[targets])
+            targets, values = targets[better], values[better]
+            np.minimum.at(wave, targets, values)
+            frontier = np.unique(targets)
+            rewritten += len(frontier)
+        return rewritten
+
+
+def nearest_target_directions(targets, width, height, neighbors, max_dist):
+    """
+    Multi-source routing towards a priority ordered list of target indices.
+
+    One breadth-first wave from all targets labels every tile with its closest target, ties going to the target that
+    comes first in the list.  Targets max_dist or more away are ignored.  Returns (directions, distances): the first
+    move towards the chosen target, along x only when it is strictly further than along y, and the distance to it
+    (max_dist when there is none).
+    """
+    size = width * height
+    targets = np.asarray(targets, dtype=np.int64)
+    rank = np.full(size, size, dtype=np.int64)
+    dist = np.full(size, -1, dtype=np.int64)
+    if len(targets) > 0:
+        np.minimum.at(rank, targets, np.arange(len(targets)))
+        frontier = np.flatnonzero(rank < size)
+        dist[frontier] = 0
+        level = 0
+        while len(frontier) > 0 and level < max_dist - 1:
+            level += 1
+            candidates = neighbors[frontier].ravel()
+            labels = np.repeat(rank[frontier], neighbors.shape[1])
+            new = dist[candidates] < 0
+            candidates, labels = candidates[new], labels[new]
+            np.minimum.at(rank, candidates, labels)
+            frontier = np.unique(candidates)
+            dist[frontier] = level
+
+    found = dist >= 0
+    chosen = np.where(found, targets[np.minimum(rank, len(targets) - 1)] if len(targets) > 0 else 0, 0)
+    xs, ys = np.arange(size) % width, np.arange(size) // width
+    tx, ty = chosen % width, chosen // width
+    dx = np.where(found, np.minimum(np.minimum(np.abs(tx - xs), tx + width - xs), xs + width - tx), max_dist)
+    dy = np.where(found, np.minimum(np.minimum(np.abs(ty - ys), ty + height - ys), ys + height - ty), max_dist)
+    east = (tx - xs == dx) | (tx + width - xs == dx)
+    south = (ty - ys == dy) | (ty + height - ys == dy)
+    directions = np.where(dx > dy, np.where(east, EAST, WEST), np.where(south, SOUTH, NORTH))
+    return directions, np.where(found, dist, max_dist)
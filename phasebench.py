@@ -0,0 +1,162 @@
+"""
+Benchmark suite timing every phase of MyBot's turn, by map size, player count and game phase.
+
+Every state of the grid comes from synthetic.generate_state.  A Bot for player 1 is created and warmed up on it and
+plays TURNS turns, the map advancing between turns through engine.simulate_turn with its moves while the other players
+stay still.  The games are deterministic, so the whole grid is played ROUNDS times and every turn keeps its fastest
+time, which filters out most of the noise of a busy machine.  The median over the turns of every phase (the names of MyBot's
+profiler phases) and of the whole turn is printed as JSON:
+
+    python3 phasebench.py > results.json
+    python3 phasebench.py --save-baseline        # stores the results as the baseline
+    python3 phasebench.py --check                # exits with status 1 if a phase got slower than the baseline
+
+A phase has regressed when its median is more than TOLERANCE above the baseline and at least MIN_REGRESSION_MS
+slower; the second condition keeps the noise of sub-millisecond phases from failing the check.  Every round also
+times a fixed calibration workload, and the baseline is scaled by the ratio of the calibrations, as the same machine
+can run at quite different speeds from one run to the next.  That does not carry over between machines, so the
+baseline has to be recorded on the one that runs the check (it stores the platform it was taken on).
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+import engine
+import MyBot
+import synthetic
+from profiling import PhaseProfiler
+from scheduler import TurnScheduler
+
+SIZES = (20, 35, 50)
+PLAYER_COUNTS = (2, 4, 6)
+TURNS = 10
+ROUNDS = 5
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'phasebench_baseline.json')
+TOLERANCE = 0.3
+MIN_REGRESSION_MS = 0.5
+
+
+def state_name(size, players, phase):
+    return '{}x{} {}p {}'.format(size, size, players, phase)
+
+
+def play_state(size, players, phase, turns, seed):
+    "Milliseconds of every phase and of the whole turn, per turn, over the given number of turns from one state."
+    # the bots of the states played before must not be collected while this one is timed
+    gc.collect()
+    production, owner, strength = synthetic.generate_state(size, size, players, phase, seed)
+    bot = MyBot.Bot.from_arrays(1, production, owner, strength)
+    bot.warm_up()
+    # no phase may be skipped for time, and the phases are recorded but not written anywhere
+    bot.scheduler = TurnScheduler(budget=float('inf'))
+    bot.profiler = PhaseProfiler(size, size, path=os.devnull, memory=False)
+    neighbors = bot.game_map.neighbor_table
+    owner, strength, production = owner.ravel(), strength.ravel(), production.ravel()
+
+    timings = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        directions = bot.play_turn()
+        turn = {'turn': 1000 * (time.perf_counter() - start)}
+        turn.update((name, record[0]) for name, record in bot.profiler.phases.items())
+        timings.append(turn)
+        owner, strength = engine.simulate_turn(owner, strength, production, directions.astype(np.int64), neighbors,
+                                               players)
+        if not (owner == 1).any():
+            break
+        bot.game_map.set_frame(owner, strength)
+    bot.profiler.file.close()
+    return timings
+
+
+def calibrate(repeat=5):
+    "Fastest time of a fixed mix of Python loops and NumPy calls, in milliseconds: the speed of the machine right now."
+    values = np.random.RandomState(0).randint(0, 256, 50000)
+    fastest = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        total = 0
+        for value in values[:20000].tolist():
+            total += value & 7
+        for _ in range(20):
+            np.bincount(np.sort(values))
+        fastest = min(fastest, time.perf_counter() - start)
+    return 1000 * fastest
+
+
+def fastest_turns(plays):
+    "Median over the turns of the fastest time of every turn among the plays, per phase, in milliseconds."
+    fastest = {}
+    for turn in zip(*plays):
+        for name in turn[0]:
+            fastest.setdefault(name, []).append(min(timings[name] for timings in turn))
+    return {name: round(float(np.median(ms)), 3) for name, ms in sorted(fastest.items())}
+
+
+def run_suite(sizes, player_counts, phases, turns, rounds=ROUNDS):
+    states = [(size, players, phase, 1000 * size + 10 * players + seed)
+              for size in sizes for players in player_counts for seed, phase in enumerate(phases)]
+    # whole rounds over the grid, so a slow spell of the machine only spoils one play of a state
+    plays = {state: [] for state in states}
+    calibration = []
+    for _ in range(rounds):
+        calibration.append(calibrate())
+        for state in states:
+            plays[state].append(play_state(*state[:3], turns=turns, seed=state[3]))
+    results = {state_name(*state[:3]): fastest_turns(plays[state]) for state in states}
+    return {'platform': platform.platform(), 'calibration': round(min(calibration), 3), 'turns': turns,
+            'rounds': rounds, 'results': results}
+
+
+def regressions(suite, baseline):
+    """
+    (state, phase, baseline ms, current ms) of every phase slower than its baseline, for the states both timed.  The
+    baseline times are scaled by how much slower or faster the calibration ran.
+    """
+    scale = suite['calibration'] / baseline['calibration']
+    slower = []
+    for state, phases in suite['results'].items():
+        for phase, ms in phases.items():
+            base = baseline['results'].get(state, {}).get(phase)
+            if base is None:
+                continue
+            base = round(base * scale, 3)
+            if ms > base * (1 + TOLERANCE) and ms - base >= MIN_REGRESSION_MS:
+                slower.append((state, phase, base, ms))
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', type=int, default=SIZES)
+    parser.add_argument('--players', nargs='+', type=int, default=PLAYER_COUNTS)
+    parser.add_argument('--phases', nargs='+', choices=synthetic.PHASES, default=synthetic.PHASES)
+    parser.add_argument('--turns', type=int, default=TURNS)
+    parser.add_argument('--rounds', type=int, default=ROUNDS)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true')
+    args = parser.parse_args()
+
+    suite = run_suite(args.sizes, args.players, args.phases, args.turns, args.rounds)
+    print(json.dumps(suite, indent=1))
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(suite, f, indent=1)
+            f.write('\n')
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['platform'] != suite['platform']:
+            print('baseline taken on {}, timings may not compare'.format(baseline['platform']), file=sys.stderr)
+        slower = regressions(suite, baseline)
+        for state, phase, base, ms in slower:
+            print('{}: {} went from {:.3f} to {:.3f} ms'.format(state, phase, base, ms), file=sys.stderr)
+        sys.exit(1 if slower else 0)
@@ -0,0 +1,101 @@
+"""
+Per-phase timing (and optionally allocation) records of the bot loop.
+
+stdout belongs to the game protocol, so records go to a side-channel file as one JSON line per frame:
+
+    MYBOT_PROFILE=profile.jsonl python3 MyBot.py ...           # wall time per phase
+    MYBOT_PROFILE_MEMORY=1 MYBOT_PROFILE=profile.jsonl ...      # plus the tracemalloc peak per phase
+
+When MYBOT_PROFILE is not set every phase() call returns the same no-op context manager.  The records of one or more
+games are summarized per map size and phase with
+
+    python3 profiling.py profile.jsonl [more.jsonl ...]
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+NO_PROFILING = nullcontext()
+
+
+class PhaseProfiler:
+    "Collects the wall time of every phase of a frame and appends the frame to the profile file."
+
+    def __init__(self, width, height, path=None, memory=None):
+        if path is None:
+            path = os.environ.get('MYBOT_PROFILE')
+        if memory is None:
+            memory = bool(os.environ.get('MYBOT_PROFILE_MEMORY'))
+        self.enabled = bool(path)
+        self.memory = self.enabled and memory
+        self.size = '{}x{}'.format(width, height)
+        self.file = open(path, 'a') if self.enabled else None
+        self.frame = 0
+        self.phases = {}
+        if self.memory:
+            tracemalloc.start()
+
+    def start_frame(self):
+        self.frame += 1
+        self.phases = {}
+        self.frame_start = time.perf_counter()
+
+    def phase(self, name):
+        "Context manager timing one phase; a shared no-op when profiling is off."
+        if not self.enabled:
+            return NO_PROFILING
+        return self._record(name)
+
+    @contextmanager
+    def _record(self, name):
+        if self.memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = [round(1000 * (time.perf_counter() - start), 3)]
+            if self.memory:
+                record.append(round((tracemalloc.get_traced_memory()[1] - before) / 1024, 1))
+            self.phases[name] = record
+
+    def end_frame(self):
+        "Writes the frame record; the file is flushed every frame since the game kills the bot at the end."
+        if not self.enabled:
+            return
+        self.phases['turn'] = [round(1000 * (time.perf_counter() - self.frame_start), 3)]
+        self.file.write(json.dumps({'frame': self.frame, 'size': self.size, 'phases': self.phases}) + '\n')
+        self.file.flush()
+
+
+def summarize(paths):
+    "Prints p50 / p99 / max wall time (and max allocation peak) per map size and phase."
+    timings = {}
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                record = json.loads(line)
+                for name, values in record['phases'].items():
+                    timings.setdefault((record['size'], name), []).append(values)
+
+    print('{:>7} {:<26} {:>6} {:>9} {:>9} {:>9} {:>12}'.format('size', 'phase', 'frames', 'p50 ms', 'p99 ms',
+                                                               'max ms', 'max peak KB'))
+    for (size, name), values in sorted(timings.items(), key=lambda item: (int(item[0][0].split('x')[0]), item[0])):
+        ms = np.array([value[0] for value in values])
+        peaks = [value[1] for value in values if len(value) > 1]
+        print('{:>7} {:<26} {:>6} {:>9.2f} {:>9.2f} {:>9.2f} {:>12}'.format(
+            size, name, len(ms), np.percentile(ms, 50), np.percentile(ms, 99), ms.max(),
+            '{:.1f}'.format(max(peaks)) if peaks else '-'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+')
+    summarize(parser.parse_args().paths)
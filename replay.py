@@ -0,0 +1,146 @@
+"""
+Replay-driven benchmark of the bot's turn function.
+
+Feeds the frames of .hlt replays (from the Halite servers or engine.py) straight into MyBot's per-turn pipeline in
+this process, without a subprocess or the text protocol, and reports the decision latency per frame:
+
+    python3 replay.py game.hlt                      # play every frame as player 1
+    python3 replay.py game.hlt --player 2 --from-frame 200 --worst 10
+
+Replays are read by ReplayReader, which streams the frames one by one so late-game positions of large replays can be
+replayed without loading the whole file.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 16
+
+
+class ReplayReader:
+    """
+    Streaming reader of .hlt replays.
+
+    The keys before "frames" (width, height, num_players, player_names, productions, ...) are parsed into self.header
+    on construction; frames() then decodes one frame at a time.  Keys after the frames, such as the moves, are never
+    read.
+    """
+
+    def __init__(self, path):
+        self.file = open(path)
+        self.buffer = ''
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+        self.header = {}
+        self._expect('{')
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == 'frames':
+                break
+            self.header[key] = self._value()
+            self._expect(',')
+        self.width, self.height = self.header['width'], self.header['height']
+        self.production = np.array(self.header['productions'], dtype=np.int32)
+
+    def _fill(self):
+        "Drops the consumed part of the buffer and reads the next chunk; False at the end of the file."
+        chunk = self.file.read(CHUNK_SIZE)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def _skip_whitespace(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return
+
+    def _peek(self):
+        self._skip_whitespace()
+        return self.buffer[self.pos:self.pos + 1]
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError('expected {!r} at {!r}'.format(char, self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+
+    def _value(self):
+        "Decodes the next JSON value, reading more of the file until the value is complete."
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self._fill():
+                    raise
+                continue
+            # a number could continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def frames(self):
+        "Yields the (owner, strength) arrays of every frame, shaped (height, width)."
+        self._expect('[')
+        if self._peek() == ']':
+            return
+        while True:
+            frame = np.array(self._value(), dtype=np.int32)
+            yield frame[:, :, 0], frame[:, :, 1]
+            if self._peek() == ']':
+                return
+            self._expect(',')
+
+    def close(self):
+        self.file.close()
+
+
+def replay_latencies(path, player=1, from_frame=0, budget=None):
+    "Plays the frames of a replay through MyBot as the given player and returns (frame, seconds) records."
+    import MyBot
+
+    reader = ReplayReader(path)
+    bot = None
+    records = []
+    for frame_index, (owner, strength) in enumerate(reader.frames()):
+        if bot is None:
+            bot = MyBot.Bot.from_arrays(player, reader.production, owner, strength)
+            if budget is not None:
+                bot.scheduler.budget = budget
+        else:
+            bot.game_map.set_frame(owner, strength)
+        if frame_index < from_frame or not (owner == player).any():
+            continue
+        start = time.perf_counter()
+        bot.play_turn()
+        records.append((frame_index, time.perf_counter() - start))
+        bot.scheduler.end_turn()
+    reader.close()
+    return records
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('replays', nargs='+')
+    parser.add_argument('--player', type=int, default=1)
+    parser.add_argument('--from-frame', type=int, default=0)
+    parser.add_argument('--budget', type=float, default=None, help='turn budget of the scheduler in seconds')
+    parser.add_argument('--worst', type=int, default=5, help='number of slowest frames to list')
+    args = parser.parse_args()
+
+    for path in args.replays:
+        records = replay_latencies(path, args.player, args.from_frame, args.budget)
+        if not records:
+            print('{}: player {} is not in any of the frames'.format(path, args.player))
+            continue
+        ms = np.array([1000 * seconds for _, seconds in records])
+        print('{}: {} turns, p50 {:.2f} ms, p99 {:.2f} ms, max {:.2f} ms, total {:.2f} s'.format(
+            path, len(ms), np.percentile(ms, 50), np.percentile(ms, 99), ms.max(), ms.sum() / 1000))
+        for frame_index, seconds in sorted(records, key=lambda record: -record[1])[:args.worst]:
+            print('    frame {}: {:.2f} ms'.format(frame_index, 1000 * seconds))
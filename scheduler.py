@@ -0,0 +1,75 @@
+"""
+Per-turn deadline bookkeeping for the bot.
+
+The Halite environment gives a bot about one second per turn and kills it on timeout, so the bot runs its phases in
+priority order and stops as soon as the budget is spent, sending whatever moves it has decided so far.
+
+The budget (in seconds) is read from the MYBOT_TURN_BUDGET environment variable, and phases that got cut short or
+skipped are logged to the file named by MYBOT_LOG, if set, as is the share of the init window spent before the bot
+sent its name.  stdout belongs to the game protocol.
+"""
+
+import logging
+import os
+import time
+
+DEFAULT_TURN_BUDGET = 0.85
+# seconds the environment waits for the bot's name after sending the initial map
+INIT_BUDGET = 15.0
+
+log = logging.getLogger('mybot')
+if os.environ.get('MYBOT_LOG'):
+    log.addHandler(logging.FileHandler(os.environ['MYBOT_LOG']))
+    log.setLevel(logging.INFO)
+
+
+class TurnScheduler:
+    "Tracks the deadline of the current turn and which phases ran out of time."
+
+    def __init__(self, budget=None):
+        if budget is None:
+            budget = float(os.environ.get('MYBOT_TURN_BUDGET', DEFAULT_TURN_BUDGET))
+        self.budget = budget
+        self.frame = 0
+        self.deadline = None
+        self.phase = None
+        self.cut = []
+        self.skipped = []
+        self.late_turns = 0
+
+    def start_turn(self):
+        "Starts the clock for a new turn."
+        self.frame += 1
+        self.deadline = time.perf_counter() + self.budget
+        self.phase = None
+        self.cut = []
+        self.skipped = []
+
+    def begin(self, phase):
+        "Returns True if there is time left to start the given phase, otherwise records it as skipped."
+        if time.perf_counter() >= self.deadline:
+            self.skipped.append(phase)
+            return False
+        self.phase = phase
+        return True
+
+    def expired(self):
+        "Deadline check for the long loops: True once time is up, recording the running phase as cut short."
+        if time.perf_counter() < self.deadline:
+            return False
+        if self.phase not in self.cut:
+            self.cut.append(self.phase)
+        return True
+
+    def end_turn(self):
+        "Logs the turn if any phase got cut short or skipped."
+        if self.cut or self.skipped:
+            self.late_turns += 1
+            log.info('frame %d: over the %.3fs budget by %.3fs, cut short: %s, skipped: %s (%d late turns so far)',
+                     self.frame, self.budget, time.perf_counter() - self.deadline, ', '.join(self.cut) or '-',
+                     ', '.join(self.skipped) or '-', self.late_turns)
+
+
+def report_init(seconds, budget=INIT_BUDGET):
+    "Logs how much of the init window the imports, the setup and the warm-up took."
+    log.info('init: %.3fs of the %.0fs init budget (%.1f%%)', seconds, budget, 100 * seconds / budget)
@@ -0,0 +1,53 @@
+"""
+Seeded synthetic game states for performance work.
+
+Starting from a map of engine.generate_map, every player's territory grows out of its starting square, a random half
+of the frontier tiles at a time, until the players together own the share of the map of the game phase:
+
+    early  a few percent of the map, every player still on its own
+    mid    about half of the map, the territories have grown into each other along a frontier
+    late   most of the map, a few neutral pockets left
+
+Owned squares get random strengths up to the cap of the phase, and neutral tiles next to two players are emptied out
+like after a fight.  States are (production, owner, strength) arrays of shape (height, width), the arguments of
+MyBot.Bot.from_arrays after the player id.
+"""
+
+import numpy as np
+
+import engine
+import hlt
+
+PHASES = ('early', 'mid', 'late')
+# share of the map owned by all players together, and the highest strength of an owned square
+OWNED_SHARE = {'early': 0.05, 'mid': 0.5, 'late': 0.9}
+STRENGTH_CAP = {'early': 120, 'mid': 255, 'late': 255}
+
+
+def generate_state(width, height, players, phase, seed):
+    "A synthetic state of the given phase; the same arguments always give the same state."
+    rng = np.random.RandomState(seed)
+    owner, strength, production = engine.generate_map(width, height, players, seed)
+    neighbors = hlt.neighbor_table(width, height, hlt.radius_offsets(1)[:4])
+    target = int(OWNED_SHARE[phase] * width * height)
+
+    owned = np.count_nonzero(owner)
+    while owned < target:
+        # half of the neutral tiles next to a player go to one of the players around them, picked at random
+        around = owner[neighbors]
+        frontier = np.flatnonzero((owner == 0) & (around > 0).any(axis=1))
+        if len(frontier) == 0:
+            break
+        frontier = rng.permutation(frontier)[:min(-(-len(frontier) // 2), target - owned)]
+        picks = ((around[frontier] > 0) + rng.rand(len(frontier), 4)).argmax(axis=1)
+        owner[frontier] = around[frontier, picks]
+        owned += len(frontier)
+
+    taken = owner > 0
+    strength[taken] = rng.randint(0, STRENGTH_CAP[phase] + 1, np.count_nonzero(taken))
+    # neutral tiles between two players
+    around = owner[neighbors]
+    lowest = np.where(around > 0, around, players + 1).min(axis=1)
+    strength[(owner == 0) & (lowest < around.max(axis=1))] = 0
+    shape = (height, width)
+    return production.reshape(shape), owner.reshape(shape), strength.reshape(shape)
@@ -0,0 +1,88 @@
+"""
+pathing.nearest_target_directions against the brute-force find_nearest_direction it replaced:
+
+    python3 -m pytest test_pathing.py
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+import hlt
+import pathing
+
+
+def random_map(width, height, seed):
+    "An ArrayGameMap with random production, strengths and owners (neutral, player 1 or player 2)."
+    rng = random.Random(seed)
+    size = width * height
+    runs = [value for _ in range(size) for value in (1, rng.choice((0, 0, 1, 2)))]
+    strengths = [rng.randint(0, 255) for _ in range(size)]
+    production = [rng.randint(0, 15) for _ in range(size)]
+    return hlt.ArrayGameMap('{} {}'.format(width, height), ' '.join(map(str, production)),
+                            ' '.join(map(str, runs + strengths)))
+
+
+def nearest_direction(game_map, owned_square, targets, max_dist):
+    "The brute-force find_nearest_direction of MyBot.py before pathing, as the reference."
+    min_distance = max_dist
+    min_x, min_y = min_distance, min_distance
+    square_x, square_y = 0, 0
+    for square in targets:
+        dx, dy, dist = game_map.get_distance_2(square, owned_square)
+        if dist < min_distance:
+            min_x, min_y, square_x, square_y, min_distance = dx, dy, square.x, square.y, dist
+    if min_x > min_y:
+        return hlt.EAST if square_x - owned_square.x == min_x or square_x + game_map.width - owned_square.x == min_x \
+            else hlt.WEST
+    return hlt.SOUTH if square_y - owned_square.y == min_y or square_y + game_map.height - owned_square.y == min_y \
+        else hlt.NORTH
+
+
+def assert_same_routes(game_map, targets, max_dist):
+    "Every square of the map gets the direction and distance of the brute force towards the list of target squares."
+    width, height = game_map.width, game_map.height
+    indices = [game_map.index(square) for square in targets]
+    neighbors = hlt.neighbor_table(width, height, hlt.radius_offsets(1)[:4])
+    directions, distances = pathing.nearest_target_directions(indices, width, height, neighbors, max_dist)
+    for square in game_map:
+        i = game_map.index(square)
+        expected = nearest_direction(game_map, square, targets, max_dist)
+        nearest = min([game_map.get_distance(square, target) for target in targets] + [max_dist])
+        assert (directions[i], distances[i]) == (expected, nearest), (square.x, square.y)
+
+
+@pytest.mark.parametrize('width, height', [(20, 20), (15, 23), (30, 12)])
+@pytest.mark.parametrize('seed', range(3))
+def test_random_maps(width, height, seed):
+    game_map = random_map(width, height, seed)
+    # a scattered list in random order, so many squares have several targets at the same distance
+    targets = [square for square in game_map if square.owner == 0]
+    targets = random.Random(seed).sample(targets, len(targets) // 6)
+    for max_dist in (width + height, 6):
+        assert_same_routes(game_map, targets, max_dist)
+
+
+@pytest.mark.parametrize('width, height', [(10, 10), (9, 13)])
+def test_wrap_around(width, height):
+    game_map = random_map(width, height, 0)
+    # targets in the corners are nearest across the edges for most of the map
+    corners = [(0, 0), (width - 1, height - 1), (0, height - 1), (width - 1, 0)]
+    for count in range(1, len(corners) + 1):
+        assert_same_routes(game_map, [game_map.square(x, y) for x, y in corners[:count]], width + height)
+
+
+def test_ties():
+    game_map = random_map(12, 12, 0)
+    # equally far targets both ways round the map, and in every order of the list
+    for targets in ([(3, 3), (9, 9)], [(9, 9), (3, 3)], [(0, 6), (6, 0), (6, 6), (0, 0)], [(6, 6), (0, 0), (0, 6)]):
+        assert_same_routes(game_map, [game_map.square(x, y) for x, y in targets], 24)
+    assert_same_routes(game_map, [], 24)
+
+
+def test_empty_targets_route_nowhere():
+    neighbors = hlt.neighbor_table(5, 5, hlt.radius_offsets(1)[:4])
+    directions, distances = pathing.nearest_target_directions([], 5, 5, neighbors, 7)
+    assert np.array_equal(distances, np.full(25, 7))
+    assert directions.shape == (25,)
@@ -0,0 +1,147 @@
+"""
+Runs many local games with engine.py on a process pool, for A/B testing bot versions.
+
+The first bot is the challenger, the others are its opponents.  Every (seed, map size, player count) combination of
+the grid is played once, the challenger taking seat (seed % players) and the opponents filling the other seats in
+turn.  Each finished game is appended as one JSON line to the results file, so an interrupted tournament picks up
+where it stopped when run again with the same arguments.  Games are keyed by the bots too (their commands and the
+Python sources of the scripts they run), so after a bot changed the grid is played again rather than resumed.
+
+    python3 tournament.py "python3 MyBot.py" "python3 RandomBot.py" --seeds 50 --sizes 20 30 40 50 --players 2 4
+    python3 tournament.py "python3 MyBot.py" --rev HEAD~3 --results ab.jsonl
+
+--rev exports MyBot.py and the modules next to it from a git revision, so the current bot can play an earlier
+version of itself.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+
+import engine
+
+REV_DIR = '.tournament'
+
+
+def export_revision(rev):
+    "Extracts the tree of a git revision into REV_DIR and returns the command running its MyBot.py."
+    sha = subprocess.check_output(['git', 'rev-parse', '--short', rev]).decode().strip()
+    path = os.path.join(REV_DIR, sha)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+        archive = subprocess.Popen(['git', 'archive', sha], stdout=subprocess.PIPE)
+        subprocess.check_call(['tar', '-x', '-C', path], stdin=archive.stdout)
+        archive.wait()
+    return 'python3 {}'.format(os.path.join(path, 'MyBot.py'))
+
+
+def bots_digest(commands):
+    "Hash of the bot commands and of the .py files next to every script they name, the modules the bots import."
+    digest = hashlib.sha1()
+    for command in commands:
+        digest.update(command.encode() + b'\n')
+        for argument in shlex.split(command):
+            if argument.endswith('.py') and os.path.isfile(argument):
+                folder = os.path.dirname(os.path.abspath(argument))
+                for name in sorted(os.listdir(folder)):
+                    if name.endswith('.py'):
+                        with open(os.path.join(folder, name), 'rb') as f:
+                            digest.update(name.encode() + b'\n' + f.read())
+    return digest.hexdigest()[:12]
+
+
+def game_key(seed, size, players, digest):
+    "Resume key of one game of the grid; digest is the bots_digest of the challenger and opponents."
+    return '{}/{}/{}/{}'.format(seed, size, players, digest)
+
+
+def seat_commands(challenger, opponents, seed, players):
+    "Seats the challenger at seed % players and cycles through the opponents for the other seats."
+    others = [opponents[i % len(opponents)] for i in range(players - 1)]
+    seat = seed % players
+    return others[:seat] + [challenger] + others[seat:], seat
+
+
+def play(task):
+    "Plays one game of the grid and returns its result line."
+    key, seed, size, players, challenger, opponents = task
+    commands, seat = seat_commands(challenger, opponents, seed, players)
+    result = engine.run_game(size, size, commands, seed=seed, replay_dir=None, quiet=True)
+    return {'key': key, 'seed': seed, 'size': size,
+            'players': players, 'seat': seat, 'commands': commands, 'ranks': result['ranks'],
+            'last_frames': result['last_frames'], 'frames': result['frames'],
+            'turn_ms': [[round(1000 * np.mean(times), 2) if times else 0, round(1000 * max(times), 2) if times else 0]
+                        for times in result['turn_times']]}
+
+
+def load_results(path):
+    "Returns the result lines already in the results file, skipping a torn last line."
+    results = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    pass
+    return results
+
+
+def summarize(results):
+    "Prints the challenger's win rate, the average finishing frame and the turn latencies per grid cell."
+    cells = {}
+    for result in results:
+        cells.setdefault((result['size'], result['players']), []).append(result)
+    print('{:>5} {:>7} {:>6} {:>9} {:>12} {:>18} {:>18}'.format('size', 'players', 'games', 'win rate', 'avg frame',
+                                                                'challenger ms', 'opponents ms'))
+    for (size, players), cell in sorted(cells.items()):
+        wins = sum(result['ranks'][result['seat']] == 1 for result in cell)
+        mine = [result['turn_ms'][result['seat']] for result in cell]
+        theirs = [ms for result in cell for seat, ms in enumerate(result['turn_ms']) if seat != result['seat']]
+        print('{:>5} {:>7} {:>6} {:>8.1%} {:>12.1f} {:>8.1f} / {:>7.1f} {:>8.1f} / {:>7.1f}'.format(
+            size, players, len(cell), wins / len(cell), np.mean([result['frames'] for result in cell]),
+            np.mean([ms[0] for ms in mine]), max(ms[1] for ms in mine),
+            np.mean([ms[0] for ms in theirs]), max(ms[1] for ms in theirs)))
+    wins = sum(result['ranks'][result['seat']] == 1 for result in results)
+    print('overall: {} games, challenger won {:.1%}'.format(len(results), wins / max(len(results), 1)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('bots', nargs='+', help='challenger command followed by opponent commands')
+    parser.add_argument('--rev', action='append', default=[], help='add the MyBot.py of a git revision as opponent')
+    parser.add_argument('--seeds', type=int, default=20, help='number of seeds per grid cell')
+    parser.add_argument('--first-seed', type=int, default=1)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[20, 30, 40, 50])
+    parser.add_argument('--players', nargs='+', type=int, default=[2])
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    parser.add_argument('--results', default='tournament.jsonl')
+    args = parser.parse_args()
+
+    challenger, opponents = args.bots[0], args.bots[1:] + [export_revision(rev) for rev in args.rev]
+    if not opponents:
+        parser.error('at least one opponent is needed')
+
+    digest = bots_digest([challenger] + opponents)
+    grid = [(game_key(seed, size, players, digest), seed, size, players)
+            for seed in range(args.first_seed, args.first_seed + args.seeds)
+            for size in args.sizes for players in args.players]
+    keys = set(cell[0] for cell in grid)
+    # games of other bots or another grid in the same file are neither resumed nor summarized
+    done = [result for result in load_results(args.results) if result['key'] in keys]
+    done_keys = set(result['key'] for result in done)
+    tasks = [cell + (challenger, opponents) for cell in grid if cell[0] not in done_keys]
+    print('{} games done, {} to play on {} workers'.format(len(done), len(tasks), args.workers))
+
+    with Pool(args.workers) as pool, open(args.results, 'a') as f:
+        for result in pool.imap_unordered(play, tasks):
+            f.write(json.dumps(result, separators=(',', ':')) + '\n')
+            f.flush()
+            done.append(result)
+    summarize(done)
@@ -0,0 +1,165 @@
+"""
+Grassfire and influence fields computed by worker processes while the bot runs the rest of its turn.
+
+Both fields only read the current frame and the bot needs them at different points of the turn, so the frame is
+handed to one worker per field as soon as it arrives and the results are picked up when needed:
+
+    MYBOT_WORKERS=1 python3 MyBot.py
+
+Owner and strength of every frame go to the workers through multiprocessing.shared_memory and the fields come back
+the same way; the pipes only carry a one-byte go / done per frame.  Each worker keeps its own incremental field
+(pathing.GrassfireField, influence.InfluenceMap) on its own copy of the map.  On maps below PARALLEL_MIN_TILES the
+round trip costs more than the fields themselves, and the bot stays serial.
+
+The game engine kills the bot without warning, so a worker also stops once its pipe is closed or, checking every
+PARENT_CHECK_SECONDS while idle, once the bot process is gone.
+"""
+
+import multiprocessing
+import os
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import hlt
+import influence
+import pathing
+
+# 30x30 and up; below that the two fields take a few hundred microseconds, not much more than handing them out
+PARALLEL_MIN_TILES = 900
+# number of result arrays of every field
+FIELDS = {'grassfire': 1, 'influence': 2}
+# how long an idle worker waits for a frame before checking that the bot is still alive
+PARENT_CHECK_SECONDS = 1.0
+
+
+def start_workers(game_map, my_id, enabled=None):
+    "A FieldWorkers for the map if parallel mode is on (MYBOT_WORKERS by default) and pays off, otherwise None."
+    if enabled is None:
+        enabled = bool(os.environ.get('MYBOT_WORKERS'))
+    if not enabled or game_map.width * game_map.height < PARALLEL_MIN_TILES:
+        return None
+    return FieldWorkers(game_map, my_id)
+
+
+def serve(name, connection, inherited, my_id, production, frame_memory, result_memory):
+    """
+    Worker loop: updates the field on every frame published by the parent until told to stop, or until the parent
+    dies.  inherited are the parent's ends of the pipes, which a forked worker must close to see them hang up.
+    """
+    for parent_end in inherited:
+        parent_end.close()
+    parent = multiprocessing.parent_process()
+    size = production.size
+    frame = np.ndarray((2, size), dtype=np.int32, buffer=frame_memory.buf)
+    results = np.ndarray((FIELDS[name], size), dtype=np.int32, buffer=result_memory.buf)
+    game_map = hlt.ArrayGameMap.from_arrays(production, frame[0], frame[1])
+    if name == 'grassfire':
+        field = pathing.GrassfireField(game_map, my_id, game_map.neighbor_table[:, :4])
+    else:
+        field = influence.InfluenceMap(game_map, my_id)
+    try:
+        while True:
+            if not connection.poll(PARENT_CHECK_SECONDS):
+                if parent is not None and not parent.is_alive():
+                    break
+                continue
+            if not connection.recv_bytes():
+                break
+            game_map.set_frame(frame[0], frame[1])
+            if name == 'grassfire':
+                results[0] = field.update()
+            else:
+                field.update()
+                results[0] = field.strength.ravel()
+                results[1] = field.count.ravel()
+            connection.send_bytes(b'1')
+    except EOFError:
+        pass
+    finally:
+        del frame, results
+        frame_memory.close()
+        result_memory.close()
+
+
+def shutdown(connections, processes, memories):
+    for connection in connections:
+        try:
+            connection.send_bytes(b'')
+        except OSError:
+            pass
+    for process in processes:
+        process.join(timeout=1)
+        if process.is_alive():
+            process.terminate()
+    for memory in memories:
+        memory.unlink()
+
+
+class FieldWorkers:
+    """
+    One persistent worker process per field of FIELDS.
+
+    start_frame() publishes the current frame of the map to all of them, result(name) waits for one field and returns
+    copies of its arrays (flat, row-major).  The workers are started with the map's current frame, so the first
+    start_frame() may repeat it.
+    """
+
+    def __init__(self, game_map, my_id):
+        self.game_map = game_map
+        size = game_map.width * game_map.height
+        self.frame_memory = shared_memory.SharedMemory(create=True, size=2 * size * 4)
+        self.frame = np.ndarray((2, size), dtype=np.int32, buffer=self.frame_memory.buf)
+        self.publish()
+        self.connections, self.results, self.pending = {}, {}, set()
+        memories, processes = [self.frame_memory], []
+        for name, count in FIELDS.items():
+            memory = shared_memory.SharedMemory(create=True, size=count * size * 4)
+            self.results[name] = np.ndarray((count, size), dtype=np.int32, buffer=memory.buf)
+            connection, child = multiprocessing.Pipe()
+            # a forked worker holds copies of this end and of the ends of the workers started before it
+            inherited = list(self.connections.values()) + [connection]
+            process = multiprocessing.Process(target=serve, daemon=True, name='mybot-' + name,
+                                              args=(name, child, inherited, my_id, game_map.production,
+                                                    self.frame_memory, memory))
+            process.start()
+            child.close()
+            self.connections[name] = connection
+            memories.append(memory)
+            processes.append(process)
+        self.memories = memories
+        # stops the workers and unlinks the shared memory on close() or when the bot goes away
+        self._finalizer = weakref.finalize(self, shutdown, list(self.connections.values()), processes, memories)
+
+    def publish(self):
+        self.frame[0] = self.game_map.owner.ravel()
+        self.frame[1] = self.game_map.strength.ravel()
+
+    def start_frame(self):
+        "Hands the current frame of the map to every worker."
+        # a worker may still be on the last frame if the turn skipped its field
+        for name in list(self.pending):
+            self.wait(name)
+        self.publish()
+        for name, connection in self.connections.items():
+            connection.send_bytes(b'1')
+            self.pending.add(name)
+
+    def wait(self, name):
+        self.connections[name].recv_bytes()
+        self.pending.discard(name)
+
+    def result(self, name):
+        "The result arrays of the named field on the current frame, as a (count, N) array."
+        if name in self.pending:
+            self.wait(name)
+        return self.results[name].copy()
+
+    def close(self):
+        self.pending.clear()
+        self._finalizer()
+        # the mappings can only be closed once no array views them
+        del self.frame, self.results
+        for memory in self.memories:
+            memory.close()